@@ -0,0 +1,168 @@
+# asrBackend_module.py (SenseVoice推理后端)
+
+import os, time
+import numpy as np
+import torch
+from funasr import AutoModel
+from funasr.utils.postprocess_utils import rich_transcription_postprocess
+import logging
+from logging_config import gcww
+
+# 获取根记录器
+logger = logging.getLogger("asrBackend_module")
+
+
+class SenseVoiceBackend:
+    """SenseVoiceSmall推理后端
+
+    支持torch (funasr AutoModel) 与onnx (funasr_onnx, 可选int8量化) 两种后端,
+    推理设备可自动选择, 并在启动时报告实时率(RTF).
+    """
+
+    def __init__(self, main_settings, sample_rate=16000):
+        """推理后端初始化
+
+        Args:
+            main_settings (dict): 配置文件读取后得到的dict
+            sample_rate (int, optional): 输入音频采样率. Defaults to 16000.
+        """
+        self.sample_rate = sample_rate
+        self.model_dir = gcww(
+            main_settings, "asr_model_dir", "./SenseVoiceSmall", logger
+        )
+        self.backend = gcww(main_settings, "asr_backend", "torch", logger)
+        self.device = self._select_device(
+            gcww(main_settings, "asr_device", "auto", logger)
+        )
+        self.num_threads = gcww(main_settings, "asr_num_threads", 0, logger)
+        self.onnx_quantize = gcww(main_settings, "asr_onnx_quantize", True, logger)
+        self._configure_threads()
+
+        self.asr_model = None
+        self.onnx_model = None
+        if self.backend == "onnx" and not self._load_onnx():
+            logger.warning("onnx后端加载失败, 改用torch后端")
+            self.backend = "torch"
+        elif self.backend not in ("torch", "onnx"):
+            logger.warning(f"不支持的ASR后端'{self.backend}', 改用torch后端")
+            self.backend = "torch"
+        if self.backend == "torch":
+            self._load_torch()
+
+        if gcww(main_settings, "asr_report_rtf", True, logger):
+            self.report_rtf()
+
+    def _select_device(self, device):
+        """选择推理设备
+
+        Args:
+            device (str): 配置的设备名称, "auto"表示自动选择
+
+        Returns:
+            str: 实际使用的设备名称
+        """
+        cuda_available = torch.cuda.is_available()
+        if device == "auto":
+            device = "cuda:0" if cuda_available else "cpu"
+            logger.info(f"ASR推理设备自动选择: {device}")
+        elif str(device).startswith("cuda") and not cuda_available:
+            logger.warning(f"配置的ASR推理设备{device}不可用 (未检测到CUDA), 改用cpu")
+            device = "cpu"
+        return device
+
+    def _configure_threads(self):
+        """配置CPU推理线程数 (0表示使用逻辑核心数的一半)"""
+        if self.num_threads <= 0:
+            self.num_threads = max(1, (os.cpu_count() or 2) // 2)
+        if self.device == "cpu":
+            torch.set_num_threads(self.num_threads)
+            logger.info(f"ASR推理线程数: {self.num_threads}")
+
+    def _load_torch(self):
+        """加载torch后端 (funasr AutoModel)"""
+        self.asr_model = AutoModel(
+            model=self.model_dir,
+            trust_remote_code=True,
+            device=self.device,
+            ncpu=self.num_threads,
+        )
+
+    def _load_onnx(self):
+        """加载onnx后端 (首次加载时会自动导出onnx模型)
+
+        Returns:
+            bool: 是否加载成功
+        """
+        try:
+            from funasr_onnx import SenseVoiceSmall
+        except ImportError:
+            logger.error(
+                "未安装funasr_onnx, 无法使用onnx后端, 请执行: pip install funasr-onnx onnxruntime"
+            )
+            return False
+        device_id = "-1" if self.device == "cpu" else self.device.split(":")[-1]
+        try:
+            self.onnx_model = SenseVoiceSmall(
+                self.model_dir,
+                batch_size=1,
+                device_id=device_id,
+                quantize=self.onnx_quantize,
+                intra_op_num_threads=self.num_threads,
+            )
+        except Exception as e:
+            logger.error(f"onnx模型加载失败: {e}")
+            return False
+        logger.info(
+            f"ASR使用onnx后端 ({'int8量化' if self.onnx_quantize else 'fp32'})"
+        )
+        return True
+
+    def transcribe(self, audio_input):
+        """语音识别
+
+        Args:
+            audio_input (np.ndarray | str): float32音频数组 (范围[-1,1]) 或wav文件路径
+
+        Returns:
+            str: 识别文本, 无结果时返回空字符串
+        """
+        if self.backend == "onnx":
+            res = self.onnx_model(audio_input, language="auto", textnorm="withitn")
+            text = res[0] if res else ""
+        else:
+            res = self.asr_model.generate(
+                input=audio_input,
+                cache={},
+                language="auto",  # 自动检测语言
+                use_itn=True,
+                ban_emo_unk=True,  # 情感表情输出
+                fs=self.sample_rate,
+            )
+            text = res[0]["text"] if res else ""
+        if text:
+            return rich_transcription_postprocess(text)
+        return ""
+
+    def report_rtf(self, duration=2.0):
+        """使用合成音频测量并报告实时率 (推理耗时/音频时长)
+
+        Args:
+            duration (float, optional): 测试音频时长(秒). Defaults to 2.0.
+
+        Returns:
+            float: 实时率RTF
+        """
+        rng = np.random.default_rng(0)
+        audio = (rng.standard_normal(int(duration * self.sample_rate)) * 0.01).astype(
+            np.float32
+        )
+        self.transcribe(audio)  # 预热, 不计入统计
+        start = time.perf_counter()
+        self.transcribe(audio)
+        rtf = (time.perf_counter() - start) / duration
+        logger.info(f"ASR后端: {self.backend} ({self.device}), 实时率RTF={rtf:.3f}")
+        if rtf >= 1.0:
+            logger.warning(
+                "当前ASR后端无法满足实时识别, 建议开启onnx量化后端或调整asr_num_threads"
+            )
+        return rtf
@@ -1,20 +1,21 @@
 # asr_module.py
 
-import copy
 import numpy as np
-import queue, threading
+import os, queue, threading
 import pyaudio, wave, tempfile
 from silero_vad import load_silero_vad, get_speech_timestamps
 from PyQt5.QtCore import pyqtSignal, QObject
-from funasr import AutoModel
-from funasr.utils.postprocess_utils import rich_transcription_postprocess
 import logging
 from logging_config import gcww
 
 # 配置日志
 logger = logging.getLogger("asr_module")
 
+from asrBackend_module import SenseVoiceBackend
+from vad_module import StreamingVAD
+from audioBuffer_module import AudioRingBuffer
 from vpr_module import VoicePrintRecognition
+from speakerTracker_module import SpeakerTracker
 from vits_module import vitsSpeaker
 
 
@@ -23,6 +24,7 @@ class SpeechRecognition(QObject):
     update_text_signal = pyqtSignal(tuple)  # 用于传递二元组 (音频序列, 文本)
     recording_ended_signal = pyqtSignal()  # 用于通知录音结束
     detect_speech_signal = pyqtSignal(bool)  # 用于通知检测到人声
+    speech_boundary_signal = pyqtSignal(tuple)  # 用于通知语音起止 ("start"|"end", 秒)
     # 定义声纹识别流程信号
     open_vp_register_signal = pyqtSignal(bool)  # 用于控制是否开启声纹识别注册
 
@@ -37,7 +39,22 @@ class SpeechRecognition(QObject):
         self.asr_auto_send_silence_time = gcww(
             self.settings, "asr_auto_send_silence_time", 2.7, logger
         )
-        model_dir = gcww(self.settings, "asr_model_dir", "./SenseVoiceSmall", logger)
+        # VAD模式: streaming为有状态流式检测, window为旧版滑动窗口检测
+        self.vad_mode = gcww(self.settings, "asr_vad_mode", "streaming", logger)
+        self.vad_threshold = gcww(self.settings, "asr_vad_threshold", 0.3, logger)
+        self.vad_min_silence_time = gcww(
+            self.settings, "asr_vad_min_silence_time", 0.6, logger
+        )
+        self.ring_buffer_time = gcww(self.settings, "asr_ring_buffer_time", 60, logger)
+        # 插话打断: 语音播放期间确认注册用户说话时, 停止(或降低音量)播放并开始收音
+        self.barge_in = gcww(self.settings, "asr_barge_in_switch", True, logger)
+        self.barge_in_mode = gcww(self.settings, "asr_barge_in_mode", "stop", logger)
+        self.barge_in_min_speech_time = gcww(
+            self.settings, "asr_barge_in_min_speech_time", 0.2, logger
+        )
+        self.barge_in_duck_gain = gcww(
+            self.settings, "asr_barge_in_duck_gain", 0.2, logger
+        )
 
         # 配置录音参数
         self.FORMAT = pyaudio.paInt16
@@ -47,16 +64,22 @@ class SpeechRecognition(QObject):
 
         # 初始化 Silero VAD 模型
         self.vad_model = load_silero_vad()
-
-        # 初始化 SenseVoice 模型
-        self.asr_model = AutoModel(
-            model=model_dir,
-            trust_remote_code=True,
-            device="cuda:0",  # 默认使用 GPU
+        self.streaming_vad = StreamingVAD(
+            self.vad_model,
+            sample_rate=self.RATE,
+            threshold=self.vad_threshold,
+            min_silence_duration_ms=int(self.vad_min_silence_time * 1000),
         )
 
+        # 初始化 SenseVoice 推理后端 (设备/线程/onnx量化由配置决定)
+        self.asr_backend = SenseVoiceBackend(main_settings, sample_rate=self.RATE)
+
         # 初始化声纹管理器
         self.vpr_manager = VoicePrintRecognition(main_settings)
+        # 初始化说话人跟踪 (按步长增量计算声纹, 仅在说话人切换时重新比对)
+        self.speaker_tracker = SpeakerTracker(
+            self.vpr_manager, main_settings, sample_rate=self.RATE
+        )
         # 初始化vitsSpeaker
         self.vits_speaker = vitsSpeaker(main_settings)
 
@@ -71,6 +94,8 @@ class SpeechRecognition(QObject):
 
         # 初始化音频队列
         self.audio_queue = queue.Queue()
+        # 预分配的录音环形缓冲区 (VAD窗口, 预录音和整句音频均为其零拷贝视图)
+        self.audio_ring = AudioRingBuffer(int(self.ring_buffer_time * self.RATE))
         self.audio_lock = threading.Lock()
 
         # 是否开启仅注册用户语音识别
@@ -88,6 +113,18 @@ class SpeechRecognition(QObject):
         self.audio_buffer_startup = True
         logger.debug(f"vits音频播放结束: {self.audio_buffer_startup}")
 
+    def barge_in_playback(self, speech_samples):
+        """用户插话: 清空待播放的语音任务, 当前播放停止或降低音量 (在音频消费线程中直接调用, 不经过Qt事件循环)
+
+        Args:
+            speech_samples (int): 触发时人声已持续的采样点数
+        """
+        duck = self.barge_in_mode == "duck"
+        self.vits_speaker.barge_in(duck_gain=self.barge_in_duck_gain if duck else None)
+        logger.info(
+            f"检测到用户插话, 语音播放已{'降低音量' if duck else '停止'} (人声开始后{speech_samples / self.RATE * 1000:.0f}ms)"
+        )
+
     def detect_speech(self, audio_data, sample_rate=16000):
         """使用 WebRTC VAD 检测音频数据是否包含有效语音。
 
@@ -111,7 +148,7 @@ class SpeechRecognition(QObject):
             audio_data,
             self.vad_model,
             sampling_rate=sample_rate,
-            threshold=0.3,
+            threshold=self.vad_threshold,
             return_seconds=True,
         )
 
@@ -146,10 +183,16 @@ class SpeechRecognition(QObject):
         处理音频队列中的数据, 按frame_window_ms进行检测, 并根据检测结果处理静默时长. (音频消费者)
         """
         silence_timer = 0  # 秒
-        audio_buffer = []
-        temp_frames = []  # 缓存两倍检测窗口数据
         frames_per_window = 16  # 每个时间段的帧数
         frame_window_ms = frames_per_window * (self.CHUNK / self.RATE) * 1000.0
+        window_samples = frames_per_window * self.CHUNK  # 检测窗口 (及预录音) 采样点数
+        utterance_start = None  # 当前audio_buffer在环形缓冲区中的起点, None表示未记录
+        utterance_has_speech = False  # audio_buffer中是否已包含人声 (流式VAD使用)
+        speech_samples = 0  # 当前连续人声的采样点数
+        barge_in_samples = int(self.barge_in_min_speech_time * self.RATE)
+        self.audio_ring.clear()
+        self.streaming_vad.reset()
+        self.speaker_tracker.reset()
 
         while self._is_running:
             try:
@@ -158,69 +201,105 @@ class SpeechRecognition(QObject):
                     logger.warning("audio_producer收到空帧，跳过处理")
                     continue
 
-                # 转换数据格式
+                # 转换数据格式并写入环形缓冲区
                 frame = np.frombuffer(data, dtype=np.int16)
+                self.audio_ring.append(frame)
 
-                # 缓存音频帧到临时帧
-                temp_frames.append(frame)
                 if self.audio_buffer_startup:
-                    # logger.debug("记录audio_buffer")
-                    audio_buffer.append(frame)
-
-                # 保持temp_frames的大小不超过两倍frames_per_window
-                if len(temp_frames) > 2 * frames_per_window:
-                    temp_frames.pop(0)
-
-                # 只有当temp_frames达到检测窗口大小才进行VAD检测
-                if len(temp_frames) >= frames_per_window:
+                    if utterance_start is None:  # 从当前帧开始记录audio_buffer
+                        utterance_start = self.audio_ring.total - len(frame)
+                    # 超出环形缓冲区容量的部分会被覆盖
+                    utterance_start = max(utterance_start, self.audio_ring.oldest)
+                else:
+                    utterance_start = None
+                    utterance_has_speech = False
+
+                if self.vad_mode == "streaming":
+                    # 流式VAD: 每个采样点仅打分一次, 直接读取当前语音状态
+                    for event, sample in self.streaming_vad.process(frame):
+                        self.speech_boundary_signal.emit((event, sample / self.RATE))
+                    is_active = self.streaming_vad.triggered
+                elif self.audio_ring.total >= window_samples:
+                    # 只有当缓冲区达到检测窗口大小才进行VAD检测
                     is_active = self.detect_speech(
-                        np.concatenate(temp_frames[-frames_per_window:])
+                        self.audio_ring.latest(window_samples)
                     )
-
-                    if is_active:
-                        user_name = self.vpr_manager.match_voiceprint(
-                            temp_frames[-frames_per_window:]
-                        )
-                        if user_name != "Unknown":  # 声纹已注册, 发送语音检测信号量
-                            self.detect_speech_signal.emit(True)
-                            if not self.audio_buffer_startup:  # 若还没启动audio_buffer
-                                self.audio_buffer_startup = True  # 开始记录audio_buffer
-                                # 留一定比例窗口大小的音频数据缓存, 避免出现头部丢失
-                                audio_buffer = temp_frames[:frames_per_window]
-                        silence_timer = 0
-                    else:
-                        # 检测到静默，累积静默时间
-                        self.detect_speech_signal.emit(False)
-                        silence_timer += (
-                            frame_window_ms / frames_per_window
-                        ) / 1000.0  # 转为秒
-                        # logger.debug(f"silence_timer: {silence_timer}")
-                        if audio_buffer:
-                            # 检测到人声
-                            if self.detect_speech(np.concatenate(audio_buffer)):
-                                should_transcribe = True
-                                if self.only_asr_register_user:
+                else:
+                    continue  # 窗口模式需等待缓冲区达到检测窗口大小
+
+                if is_active:
+                    speech_samples += len(frame)
+                    user_name = self.speaker_tracker.update(self.audio_ring)
+                    if user_name != "Unknown":  # 声纹已注册, 发送语音检测信号量
+                        self.detect_speech_signal.emit(True)
+                        # 若还没启动audio_buffer (语音播放中); 插话打断需人声持续足够长, 避免误打断
+                        if not self.audio_buffer_startup and (
+                            not self.barge_in or speech_samples >= barge_in_samples
+                        ):
+                            if self.barge_in:
+                                self.barge_in_playback(speech_samples)
+                            self.audio_buffer_startup = True  # 开始记录audio_buffer
+                            # 留一个窗口大小的音频数据缓存, 避免出现头部丢失
+                            utterance_start = max(
+                                self.audio_ring.total - window_samples,
+                                self.audio_ring.oldest,
+                            )
+                    if self.audio_buffer_startup:
+                        utterance_has_speech = True
+                    silence_timer = 0
+                else:
+                    # 检测到静默，累积静默时间
+                    speech_samples = 0
+                    self.detect_speech_signal.emit(False)
+                    self.speaker_tracker.on_silence()
+                    silence_timer += (
+                        frame_window_ms / frames_per_window
+                    ) / 1000.0  # 转为秒
+                    # logger.debug(f"silence_timer: {silence_timer}")
+                    if (
+                        utterance_start is not None
+                        and self.audio_ring.total > utterance_start
+                    ):
+                        audio_buffer = self.audio_ring.view(utterance_start)
+                        if self.vad_mode == "streaming":
+                            has_speech = utterance_has_speech
+                        else:
+                            has_speech = self.detect_speech(audio_buffer)
+                        # 检测到人声
+                        if has_speech:
+                            should_transcribe = True
+                            if self.only_asr_register_user:
+                                # 优先使用跟踪过程中缓存的分段结果, 避免整句重复计算声纹
+                                user_name = self.speaker_tracker.utterance_speaker(
+                                    utterance_start
+                                )
+                                if user_name is None:
                                     user_name = self.vpr_manager.match_voiceprint(
-                                        audio_buffer
+                                        [audio_buffer]
                                     )
-                                    should_transcribe = user_name != "Unknown"
-                                    logger.debug(
-                                        f"人声是否属于注册用户: {should_transcribe}"
-                                    )
-                                if should_transcribe:
-                                    self.audio_transcribe(audio_buffer)
-                                audio_buffer.clear()
-                            else:
-                                audio_buffer.pop(0)  # 移除最旧的帧
-                        if (
-                            silence_timer >= self.asr_auto_send_silence_time
-                            and self.transcribe_but_not_send
-                            and self.asr_auto_send_silence_time != -1
-                        ):
-                            logger.info("静默时间超限，触发结果发送")
-                            self.recording_ended_signal.emit()
-                            self.transcribe_but_not_send = False  # 重置未发送标志
-                            # self._is_running = False  # 停止录音
+                                should_transcribe = user_name != "Unknown"
+                                logger.debug(
+                                    f"人声是否属于注册用户: {should_transcribe}"
+                                )
+                            if should_transcribe:
+                                self.audio_transcribe(audio_buffer)
+                            utterance_start = self.audio_ring.total
+                            utterance_has_speech = False
+                            self.speaker_tracker.reset()
+                        else:
+                            # 仅保留一个窗口的预录音
+                            utterance_start = max(
+                                utterance_start, self.audio_ring.total - window_samples
+                            )
+                    if (
+                        silence_timer >= self.asr_auto_send_silence_time
+                        and self.transcribe_but_not_send
+                        and self.asr_auto_send_silence_time != -1
+                    ):
+                        logger.info("静默时间超限，触发结果发送")
+                        self.recording_ended_signal.emit()
+                        self.transcribe_but_not_send = False  # 重置未发送标志
+                        # self._is_running = False  # 停止录音
             except queue.Empty:
                 continue
             except Exception as e:
@@ -228,33 +307,50 @@ class SpeechRecognition(QObject):
                 break
         logger.debug("audio_consumer正常退出")
 
-    # 转录并记录
-    def audio_transcribe(self, frames):
-        """对包含人声的音频序列进行语音识别
+    def transcribe_in_memory(self, audio):
+        """直接将音频数组送入模型识别, 不经过磁盘
 
         Args:
-            frames (NDArray): 音频序列
+            audio (np.ndarray): int16音频序列
+
+        Returns:
+            str: 识别文本
+        """
+        return self.asr_backend.transcribe(audio.astype(np.float32) / 32768.0)
+
+    def transcribe_via_wav_file(self, audio):
+        """旧版识别路径: 写入临时wav文件后识别 (仅用于基准测试对比)
+
+        Args:
+            audio (np.ndarray): int16音频序列
+
+        Returns:
+            str: 识别文本
         """
-        audio_data = b"".join(frames)
         with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_wav:
             with wave.open(temp_wav, "wb") as wf:
                 wf.setnchannels(1)
                 wf.setsampwidth(2)
                 wf.setframerate(self.RATE)
-                wf.writeframes(audio_data)
-            res = self.asr_model.generate(
-                input=temp_wav.name,
-                cache={},
-                language="auto",  # 自动检测语言
-                use_itn=True,
-                ban_emo_unk=True,  # 情感表情输出
-            )
-            if res and res[0]["text"]:
-                text = rich_transcription_postprocess(res[0]["text"])
-                logger.debug(f"实时转录结果: {text}")
-                self.transcribe_but_not_send = True
-                copied_frames = copy.deepcopy(frames)  # 使用深拷贝传递数据
-                self.update_text_signal.emit((copied_frames, text))
+                wf.writeframes(audio.tobytes())
+        try:
+            return self.asr_backend.transcribe(temp_wav.name)
+        finally:
+            os.remove(temp_wav.name)  # 识别完成后删除临时文件
+
+    # 转录并记录
+    def audio_transcribe(self, audio):
+        """对包含人声的音频序列进行语音识别
+
+        Args:
+            audio (np.ndarray): int16音频序列
+        """
+        text = self.transcribe_in_memory(audio)
+        if text:
+            logger.debug(f"实时转录结果: {text}")
+            self.transcribe_but_not_send = True
+            # 环形缓冲区视图会被后续写入覆盖, 拷贝一份后跨线程传递
+            self.update_text_signal.emit(([audio.copy()], text))
 
     # 启动流式语音识别
     def start_streaming(self):
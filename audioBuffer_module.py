@@ -0,0 +1,98 @@
+# audioBuffer_module.py (预分配音频环形缓冲区)
+
+import numpy as np
+import logging
+
+# 获取根记录器
+logger = logging.getLogger("audioBuffer_module")
+
+
+class AudioRingBuffer:
+    """固定容量的int16环形缓冲区
+
+    底层数组为两倍容量的镜像存储 (每个采样同时写入 i 和 i+capacity),
+    因此任意不超过容量的连续区间都能以零拷贝视图的形式返回, 无需处理回绕.
+    采样位置使用从clear()开始单调递增的绝对计数.
+    """
+
+    def __init__(self, capacity, dtype=np.int16):
+        """环形缓冲区初始化
+
+        Args:
+            capacity (int): 缓冲区容量 (采样点数)
+            dtype (optional): 采样数据类型. Defaults to np.int16.
+        """
+        self.capacity = int(capacity)
+        self._buffer = np.zeros(2 * self.capacity, dtype=dtype)
+        self._total = 0  # 累计写入的采样点数
+
+    def clear(self):
+        """清空缓冲区并重置绝对计数"""
+        self._total = 0
+
+    @property
+    def total(self):
+        """累计写入的采样点数 (即下一个写入位置的绝对坐标)"""
+        return self._total
+
+    @property
+    def oldest(self):
+        """缓冲区中仍然可读的最旧采样点的绝对坐标"""
+        return max(0, self._total - self.capacity)
+
+    def append(self, samples):
+        """写入一段音频
+
+        Args:
+            samples (np.ndarray): 单通道音频数据
+        """
+        samples = np.asarray(samples, dtype=self._buffer.dtype).reshape(-1)
+        n = len(samples)
+        if n >= self.capacity:  # 超过容量时只保留最新的部分
+            self._total += n - self.capacity
+            samples = samples[-self.capacity :]
+            n = self.capacity
+        pos = self._total % self.capacity
+        first = min(n, self.capacity - pos)
+        rest = n - first
+        self._buffer[pos : pos + first] = samples[:first]
+        self._buffer[pos + self.capacity : pos + self.capacity + first] = samples[
+            :first
+        ]
+        if rest:
+            self._buffer[:rest] = samples[first:]
+            self._buffer[self.capacity : self.capacity + rest] = samples[first:]
+        self._total += n
+
+    def view(self, start, end=None):
+        """获取绝对坐标区间[start, end)的只读零拷贝视图
+
+        超出缓冲区可读范围的部分会被截断. 视图在后续写入覆盖对应区间前有效,
+        需要跨线程或长期保存时请自行copy().
+
+        Args:
+            start (int): 起始绝对坐标
+            end (int, optional): 结束绝对坐标, 默认为当前写入位置. Defaults to None.
+
+        Returns:
+            np.ndarray: 音频数据视图
+        """
+        end = self._total if end is None else min(end, self._total)
+        start = min(max(start, self.oldest), end)
+        if end == start:
+            return self._buffer[:0]
+        tail = end % self.capacity + self.capacity
+        result = self._buffer[tail - (end - start) : tail]
+        result.flags.writeable = False
+        return result
+
+    def latest(self, num_samples):
+        """获取最新num_samples个采样点的只读零拷贝视图
+
+        Args:
+            num_samples (int): 采样点数
+
+        Returns:
+            np.ndarray: 音频数据视图
+        """
+        return self.view(self._total - num_samples)
@@ -0,0 +1,183 @@
+# audioOutput_module.py (常驻低延迟音频输出)
+
+import threading
+from collections import deque
+import numpy as np
+import sounddevice as sd
+import logging
+
+# 获取根记录器
+logger = logging.getLogger("audioOutput_module")
+
+
+class AudioOutputEngine:
+    """基于sounddevice (PortAudio回调) 的常驻音频输出流
+
+    输出流只在音频格式变化时重新打开, 每次播放只需写入16位PCM数据.
+    回调线程按实际送入声卡的帧数统计播放位置, 数据播放完毕时触发finished事件.
+    """
+
+    def __init__(self, device=None, latency="low"):
+        """输出引擎初始化 (输出流在首次open时创建)
+
+        Args:
+            device (int | str, optional): 输出设备, None表示系统默认设备. Defaults to None.
+            latency (str | float, optional): 输出延迟 ("low"/"high"或秒数). Defaults to "low".
+        """
+        self.device = device
+        self.latency = latency
+        self.sample_rate = 0
+        self.channels = 0
+        self._stream = None
+        self._lock = threading.Lock()
+        self._chunks = deque()  # 待播放的PCM数据 [帧数, 声道数]
+        self._offset = 0  # 第一块数据中已播放的帧数
+        self._played = 0  # 本次播放已送入声卡的帧数
+        self._ended = True  # 本次播放的数据是否已全部写入
+        self.gain = 1.0  # 输出增益 (用于插话时降低音量)
+        self._tail = None  # 被淡出停止的剩余音频 (已乘以淡出曲线), 与后续播放混合输出
+        self._tail_pos = 0
+        self.finished = threading.Event()  # 本次播放结束 (播放完毕或被停止)
+        self.finished.set()
+
+    def check(self):
+        """检查输出设备是否可用, 不可用时抛出异常"""
+        sd.check_output_settings(device=self.device, dtype="int16")
+
+    def open(self, sample_rate, channels):
+        """按音频格式打开输出流, 格式不变时复用已打开的流
+
+        Args:
+            sample_rate (int): 采样率
+            channels (int): 声道数
+        """
+        if self._stream is not None and (sample_rate, channels) == (
+            self.sample_rate,
+            self.channels,
+        ):
+            return
+        self.close()
+        self._stream = sd.OutputStream(
+            samplerate=sample_rate,
+            channels=channels,
+            dtype="int16",
+            device=self.device,
+            latency=self.latency,
+            callback=self._callback,
+        )
+        self._stream.start()
+        self.sample_rate = sample_rate
+        self.channels = channels
+        logger.info(
+            f"音频输出流已打开: {sample_rate}Hz, {channels}声道, 延迟{self._stream.latency * 1000:.1f}ms"
+        )
+
+    def close(self):
+        """关闭输出流"""
+        self.stop()
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def _callback(self, outdata, frames, time_info, status):
+        """PortAudio回调: 从队列中取出数据送入声卡, 数据不足时补零"""
+        filled = 0
+        with self._lock:
+            while filled < frames and self._chunks:
+                chunk = self._chunks[0]
+                n = min(frames - filled, len(chunk) - self._offset)
+                outdata[filled : filled + n] = chunk[self._offset : self._offset + n]
+                filled += n
+                self._offset += n
+                if self._offset >= len(chunk):
+                    self._chunks.popleft()
+                    self._offset = 0
+            self._played += filled
+            if self._ended and not self._chunks:
+                self.finished.set()
+            tail = self._tail
+            if tail is not None:
+                tail_pos = self._tail_pos
+                self._tail_pos += frames
+                if self._tail_pos >= len(tail):
+                    self._tail = None
+        if self.gain != 1.0 and filled:
+            np.multiply(outdata[:filled], self.gain, out=outdata[:filled], casting="unsafe")
+        if filled < frames:
+            outdata[filled:] = 0
+        if tail is not None:  # 混入淡出中的音频, 实现交叉淡化
+            n = min(frames, len(tail) - tail_pos)
+            mixed = outdata[:n].astype(np.float32) + tail[tail_pos : tail_pos + n]
+            outdata[:n] = np.clip(mixed, -32768, 32767)
+
+    def begin(self, gain=1.0):
+        """开始新的一次播放 (清空未播放的数据并重置播放位置)
+
+        Args:
+            gain (float, optional): 本次播放的输出增益. Defaults to 1.0.
+        """
+        with self._lock:
+            self._chunks.clear()
+            self._offset = 0
+            self._played = 0
+            self._ended = False
+            self.gain = gain
+            self.finished.clear()
+
+    def write(self, pcm):
+        """写入16位PCM数据
+
+        Args:
+            pcm (bytes): 与输出流格式一致的PCM数据
+        """
+        data = np.frombuffer(pcm, dtype=np.int16).reshape(-1, self.channels)
+        with self._lock:
+            self._chunks.append(data)
+
+    def set_gain(self, gain):
+        """设置本次播放的输出增益 (下一次播放开始时按begin的参数重新设置)
+
+        Args:
+            gain (float): 增益, 范围[0, 1]
+        """
+        self.gain = gain
+
+    def end(self):
+        """本次播放的数据已全部写入, 播放完毕后触发finished事件"""
+        with self._lock:
+            self._ended = True
+            if not self._chunks:
+                self.finished.set()
+
+    def stop(self, fade_time=0.0):
+        """停止本次播放
+
+        Args:
+            fade_time (float, optional): 淡出时长(秒), 大于0时剩余音频按线性淡出继续输出,
+                并与之后开始的播放混合 (交叉淡化). Defaults to 0.0.
+        """
+        with self._lock:
+            fade_frames = int(fade_time * self.sample_rate)
+            if fade_frames > 0 and self._chunks:
+                remaining = np.concatenate(self._chunks)[self._offset :][:fade_frames]
+                ramp = np.linspace(self.gain, 0.0, len(remaining), dtype=np.float32)
+                self._tail = remaining.astype(np.float32) * ramp[:, None]
+                self._tail_pos = 0
+            self._chunks.clear()
+            self._offset = 0
+            self._ended = True
+            self.finished.set()
+
+    @property
+    def position(self):
+        """本次播放中已经从声卡输出的帧数 (扣除输出延迟)"""
+        latency = self._stream.latency if self._stream is not None else 0.0
+        return max(0, self._played - int(latency * self.sample_rate))
+
+    def wait(self, timeout=None):
+        """等待本次播放结束
+
+        Returns:
+            bool: 是否已结束
+        """
+        return self.finished.wait(timeout)
@@ -0,0 +1,66 @@
+# asr_input_bench.py
+# 对比语音识别的两种输入路径: 内存中的numpy数组 vs 临时wav文件
+# 用法 (在项目根目录执行): python benchmark/asr_input_bench.py --wav sample.wav --repeat 20
+
+import os, sys, time, argparse, wave
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yaml, logging, logging_config
+from asr_module import SpeechRecognition
+
+logger = logging.getLogger("asr_module")
+
+
+def load_wav_int16(path):
+    """读取16kHz单通道int16 wav文件"""
+    with wave.open(path, "rb") as wf:
+        if wf.getframerate() != 16000 or wf.getnchannels() != 1:
+            raise ValueError("测试音频需要为16kHz单通道wav")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+def time_path(func, audio, repeat):
+    """多次执行识别函数并返回每次耗时(毫秒)"""
+    func(audio)  # 预热, 不计入统计
+    costs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(audio)
+        costs.append((time.perf_counter() - start) * 1000.0)
+    return np.array(costs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ASR输入路径基准测试")
+    parser.add_argument("--config", default="./config.yaml", help="配置文件路径")
+    parser.add_argument("--wav", default=None, help="16kHz单通道测试音频, 缺省为5秒噪声")
+    parser.add_argument("--repeat", type=int, default=10, help="每条路径的重复次数")
+    args = parser.parse_args()
+
+    logging_config.setup_logging()
+    with open(args.config, "r", encoding="utf-8") as f:
+        settings = yaml.safe_load(f)
+
+    if args.wav:
+        audio = load_wav_int16(args.wav)
+    else:
+        rng = np.random.default_rng(0)
+        audio = (rng.standard_normal(16000 * 5) * 1000).astype(np.int16)
+
+    recognizer = SpeechRecognition(settings)
+    results = {
+        "memory": time_path(recognizer.transcribe_in_memory, audio, args.repeat),
+        "wav_file": time_path(recognizer.transcribe_via_wav_file, audio, args.repeat),
+    }
+
+    duration = len(audio) / 16000
+    print(f"音频时长: {duration:.2f}s, 重复次数: {args.repeat}")
+    for name, costs in results.items():
+        print(
+            f"{name:>8}: mean {costs.mean():8.2f} ms | p50 {np.median(costs):8.2f} ms"
+            f" | p90 {np.percentile(costs, 90):8.2f} ms"
+        )
+    saved = results["wav_file"].mean() - results["memory"].mean()
+    print(f"内存路径平均节省: {saved:.2f} ms/次")
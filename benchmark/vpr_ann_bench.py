@@ -0,0 +1,79 @@
+# vpr_ann_bench.py
+# 对比声纹检索的近似最近邻索引(IVF)与精确比对的召回率和耗时
+# 用法 (在项目根目录执行): python benchmark/vpr_ann_bench.py --num 20000 --nprobe 8
+
+import os, sys, time, argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vprIndex_module import IVFIndex
+
+
+def make_dataset(num, dim, samples_per_person, num_queries, seed=0):
+    """生成模拟声纹数据: 每个用户一个中心, 样本和查询为中心附近的扰动"""
+    rng = np.random.default_rng(seed)
+    num_person = max(1, num // samples_per_person)
+    centers = rng.standard_normal((num_person, dim)).astype(np.float32)
+    owners = rng.integers(0, num_person, num)
+    vectors = centers[owners] + 0.6 * rng.standard_normal((num, dim)).astype(
+        np.float32
+    )
+    query_owners = rng.integers(0, num_person, num_queries)
+    queries = centers[query_owners] + 0.6 * rng.standard_normal(
+        (num_queries, dim)
+    ).astype(np.float32)
+    return vectors, queries
+
+
+def exact_search(matrix, query, top_k):
+    """精确检索 (与VoicePrintRecognition的矩阵比对一致)"""
+    scores = matrix @ (query / np.linalg.norm(query))
+    top = np.argpartition(-scores, top_k - 1)[:top_k]
+    return top[np.argsort(-scores[top])]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="声纹ANN索引基准测试")
+    parser.add_argument("--num", type=int, default=20000, help="样本库特征数量")
+    parser.add_argument("--dim", type=int, default=192, help="特征维度")
+    parser.add_argument("--queries", type=int, default=500, help="查询数量")
+    parser.add_argument("--top-k", type=int, default=5, help="召回数量")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    vectors, queries = make_dataset(args.num, args.dim, 3, args.queries)
+    matrix = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    start = time.perf_counter()
+    truth = [exact_search(matrix, q, args.top_k) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000.0 / len(queries)
+
+    index = IVFIndex()
+    start = time.perf_counter()
+    index.build(vectors, list(range(args.num)))
+    build_s = time.perf_counter() - start
+
+    print(f"样本数: {args.num}, 维度: {args.dim}, 簇数量: {len(index.centroids)}")
+    print(f"索引构建耗时: {build_s:.2f}s")
+    print(
+        f"{'exact':>10}: recall@1 1.000 | recall@{args.top_k} 1.000 | {exact_ms:7.3f} ms/query"
+    )
+    for nprobe in args.nprobe:
+        index.nprobe = nprobe
+        start = time.perf_counter()
+        results = [index.search(q, args.top_k)[0] for q in queries]
+        ann_ms = (time.perf_counter() - start) * 1000.0 / len(queries)
+        # recall@1决定声纹匹配结果, recall@k反映候选排名的完整度
+        top1_hits = sum(
+            1 for found, expected in zip(results, truth) if found[:1] == [expected[0]]
+        )
+        topk_hits = sum(
+            len(set(found) & set(expected.tolist()))
+            for found, expected in zip(results, truth)
+        )
+        print(
+            f"{'nprobe=' + str(nprobe):>10}: recall@1 {top1_hits / len(queries):.3f}"
+            f" | recall@{args.top_k} {topk_hits / (len(queries) * args.top_k):.3f}"
+            f" | {ann_ms:7.3f} ms/query"
+        )
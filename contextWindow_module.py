@@ -0,0 +1,147 @@
+# contextWindow_module.py (按token预算组装模型上下文)
+
+import re, json
+import logging
+from logging_config import gcww
+
+# 获取根记录器
+logger = logging.getLogger("contextWindow_module")
+
+
+# 中日文字符 (假名/汉字/全角标点) 近似按每字一个token计算
+_CJK_PATTERN = re.compile(r"[\u3000-\u30ff\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+
+def approx_token_count(text: str) -> int:
+    """近似估算token数 (中日文每字1个token, 其余字符每4个1个token)
+
+    Args:
+        text (str): 文本
+
+    Returns:
+        int: token数
+    """
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class ContextWindow:
+    """按token预算组装每次请求的消息列表
+
+    组装顺序: 系统prompt (始终保留) -> 从最新开始的完整对话轮次 -> 超长的工具输出截断.
+    一轮对话从用户消息开始, 包含其后的函数调用/工具输出/助手回复, 整轮保留或整轮丢弃.
+    token计数器可替换: 内置近似估算与tiktoken, 也可以直接传入计数函数.
+    """
+
+    MESSAGE_OVERHEAD = 4  # 每条消息的格式开销(token)
+    TRUNCATED_MARK = "...(内容过长已截断)"
+
+    def __init__(self, main_settings, tokenizer=None):
+        """上下文窗口初始化
+
+        Args:
+            main_settings (dict): 配置文件读取后得到的dict
+            tokenizer (callable, optional): token计数函数 (str -> int), 传入时忽略配置中的计数方式. Defaults to None.
+        """
+        self.max_tokens = gcww(main_settings, "context_max_tokens", 8000, logger)
+        self.tool_max_tokens = gcww(
+            main_settings, "context_tool_max_tokens", 500, logger
+        )
+        if tokenizer is None:
+            tokenizer = self._load_tokenizer(
+                gcww(main_settings, "context_tokenizer", "approx", logger)
+            )
+        self.count_tokens = tokenizer
+
+    def _load_tokenizer(self, name):
+        """按配置加载token计数函数
+
+        Args:
+            name (str): "approx" 或 "tiktoken:<编码名称>"
+
+        Returns:
+            callable: token计数函数
+        """
+        if name.startswith("tiktoken"):
+            encoding_name = name.partition(":")[2] or "cl100k_base"
+            try:
+                import tiktoken
+
+                encoding = tiktoken.get_encoding(encoding_name)
+            except ImportError:
+                logger.error("未安装tiktoken, 使用近似token计数, 请执行: pip install tiktoken")
+            except Exception as e:
+                logger.error(f"加载tiktoken编码{encoding_name}失败: {e}, 使用近似token计数")
+            else:
+                return lambda text: len(encoding.encode(text, disallowed_special=()))
+        elif name != "approx":
+            logger.warning(f"未知的token计数方式: {name}, 使用近似token计数")
+        return approx_token_count
+
+    def message_tokens(self, message):
+        """计算单条消息的token数 (包括函数调用参数)"""
+        tokens = self.MESSAGE_OVERHEAD + self.count_tokens(message.get("content") or "")
+        for key in ("function_call", "tool_calls"):
+            if message.get(key):
+                tokens += self.count_tokens(
+                    json.dumps(message[key], ensure_ascii=False, default=str)
+                )
+        return tokens
+
+    def _truncate_tool_output(self, message):
+        """截断超出预算的函数/工具输出, 返回新的消息"""
+        if message.get("role") not in ("function", "tool"):
+            return message
+        content = message.get("content") or ""
+        tokens = self.count_tokens(content)
+        if tokens <= self.tool_max_tokens:
+            return message
+        # 按字符比例截断, 保留开头部分
+        keep = len(content) * self.tool_max_tokens // tokens
+        return dict(message, content=content[:keep] + self.TRUNCATED_MARK)
+
+    @staticmethod
+    def _split_turns(messages):
+        """将非系统消息按用户消息切分为对话轮次"""
+        turns = []
+        for message in messages:
+            if message.get("role") == "user" or not turns:
+                turns.append([])
+            turns[-1].append(message)
+        return turns
+
+    def build(self, messages):
+        """按token预算组装请求消息
+
+        Args:
+            messages (list): 完整的消息列表 (系统消息与对话消息)
+
+        Returns:
+            tuple: (本次请求的消息列表, 去掉预算外旧轮次后的消息列表)
+                预算只会被更新的轮次占用, 已经超出预算的旧轮次之后也不会再被使用, 可以从内存中移除
+        """
+        if self.max_tokens <= 0:  # 不限制上下文长度
+            return list(messages), messages
+        system = [m for m in messages if m.get("role") == "system"]
+        turns = self._split_turns([m for m in messages if m.get("role") != "system"])
+
+        budget = self.max_tokens - sum(self.message_tokens(m) for m in system)
+        selected = []
+        used = 0
+        for turn in reversed(turns):
+            turn = [self._truncate_tool_output(m) for m in turn]
+            tokens = sum(self.message_tokens(m) for m in turn)
+            # 最新一轮 (本次用户输入) 始终保留
+            if selected and used + tokens > budget:
+                break
+            selected.append(turn)
+            used += tokens
+
+        dropped = len(turns) - len(selected)
+        if dropped:
+            logger.debug(
+                f"上下文超出预算, 丢弃最早的{dropped}轮对话 (保留{len(selected)}轮, 约{used}token)"
+            )
+        request = system + [m for turn in reversed(selected) for m in turn]
+        kept = system + [m for turn in turns[dropped:] for m in turn]
+        return request, kept
@@ -0,0 +1,107 @@
+# dialogueSummary_module.py (对话历史滚动摘要)
+
+import threading
+import logging
+from logging_config import gcww
+
+# 获取根记录器
+logger = logging.getLogger("dialogueSummary_module")
+
+from replyParser_module import replyParser
+
+
+class DialogueCompactor:
+    """后台对话压缩: 未摘要的历史记录超过阈值时, 将最早的一段对话与已有摘要合并为新的摘要
+
+    摘要在后台线程中调用模型生成并写入历史数据库, 之后加载上下文时以摘要代替被覆盖的原始对话,
+    使长时间对话的prompt保持简短, 同时不丢失前文信息.
+    """
+
+    SUMMARY_PROMPT = """你是对话记录整理助手. 请将已有摘要与新的对话记录合并为一份新的摘要.
+要求: 使用第三人称, 保留用户身份, 重要事实, 约定, 偏好以及尚未结束的话题, 省略寒暄和重复内容.
+直接输出摘要正文, 不超过{max_chars}字."""
+
+    def __init__(self, main_settings, history, complete):
+        """对话压缩初始化
+
+        Args:
+            main_settings (dict): 配置文件读取后得到的dict
+            history (DialogueHistory): 对话历史记录
+            complete (callable): 单次请求模型的函数 (messages -> str), 不使用也不写入对话上下文
+        """
+        self.enabled = gcww(main_settings, "summary_switch", False, logger)
+        self.trigger_num = gcww(main_settings, "summary_trigger_num", 60, logger)
+        self.block_num = gcww(main_settings, "summary_block_num", 40, logger)
+        self.max_chars = gcww(main_settings, "summary_max_chars", 500, logger)
+        self.reply_schema = gcww(main_settings, "reply_schema", "ep_zh_jp", logger)
+        self.history = history
+        self.complete = complete
+        self._thread = None
+        self._updated = threading.Event()  # 有新的摘要尚未应用到内存中的上下文
+
+    def maybe_compact(self):
+        """未摘要的记录超过阈值时启动后台压缩 (同一时间只运行一个压缩任务)"""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        summary = self.history.get_summary()
+        last_record_id = summary["last_record_id"] if summary else 0
+        if self.history.count_records_after(last_record_id) <= self.trigger_num:
+            return
+        self._thread = threading.Thread(
+            target=self._compact, args=(summary, last_record_id), daemon=True
+        )
+        self._thread.start()
+
+    def consume_update(self):
+        """是否有新的摘要需要应用到内存中的上下文 (调用后清除标记)
+
+        Returns:
+            bool: 是否有新的摘要
+        """
+        if self._updated.is_set():
+            self._updated.clear()
+            return True
+        return False
+
+    def _format_record(self, record):
+        """将一条历史记录转为摘要输入文本 (助手回复只保留中文部分)"""
+        content = record["content"]
+        if record["role"] == "assistant":
+            parsed_reply = replyParser(content, schema=self.reply_schema)
+            if not parsed_reply.get("status"):
+                content = parsed_reply.get("data").get("zh")
+        return f"{record['user_name']}: {content}"
+
+    def _compact(self, summary, last_record_id):
+        """将最早的一段对话与已有摘要合并为新的摘要"""
+        records = self.history.get_records_after(last_record_id, self.block_num)
+        # 不在一轮对话中间切分, 摘要段以助手回复结束
+        while records and records[-1]["role"] != "assistant":
+            records.pop()
+        if not records:
+            return
+
+        dialogue = "\n".join(self._format_record(r) for r in records)
+        previous = summary["content"] if summary else "无"
+        messages = [
+            {
+                "role": "system",
+                "content": self.SUMMARY_PROMPT.format(max_chars=self.max_chars),
+            },
+            {
+                "role": "user",
+                "content": f"已有摘要:\n{previous}\n\n新的对话记录:\n{dialogue}",
+            },
+        ]
+        try:
+            content = self.complete(messages).strip()
+        except Exception as e:
+            logger.error(f"对话摘要生成失败: {e}")
+            return
+        if not content:
+            logger.warning("对话摘要为空, 本次不更新")
+            return
+
+        self.history.add_summary(content, records[-1]["id"])
+        self._updated.set()
+        logger.info(f"已将{len(records)}条对话记录压缩为摘要 ({len(content)}字)")
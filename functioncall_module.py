@@ -2,6 +2,7 @@
 
 import ollama
 import yaml, json, uuid
+from typing import Generator
 import logging
 from logging_config import gcww
 
@@ -11,6 +12,7 @@ logger = logging.getLogger("functioncall_module")
 # 导入模块类
 from ollamaModel_module import ollamaModel  # ollama框架
 from openaiTypeModel_module import openaiTypeModel  # openaiType模型
+from thinkFilter_module import ThinkTagFilter  # 推理内容过滤
 
 # 导入function
 from functioncall import load_custom_functions
@@ -71,6 +73,93 @@ class FunctioncallManager:
         for func_name, _ in self.function_map.items():
             logger.debug(f"加载函数: {func_name}")
 
+    def _ollama_tools(self):
+        """将函数描述转换为ollama的tools格式"""
+        return [{"type": "function", "function": _func} for _func in self.functions]
+
+    def _run_function_openai(self, function_name, arguments):
+        """执行openaiType模型请求的函数调用, 并将调用过程追加到上下文
+
+        Args:
+            function_name (str): 函数名称
+            arguments (str): JSON格式的函数参数
+
+        Returns:
+            bool: 函数是否已注册并执行
+        """
+        if function_name not in self.function_map:
+            logger.warning(f"模型请求了未注册的函数: {function_name}")
+            return False
+        function_args = json.loads(arguments or "{}")
+        logger.debug(f"FunctionCall模块执行函数调用: {function_name}: {function_args}")
+        function_response = self.function_map[function_name](**function_args)
+        self.chat_model.messages.append(
+            {
+                "role": "assistant",
+                "content": "",
+                "function_call": {"name": function_name, "arguments": arguments},
+            }
+        )
+        self.chat_model.messages.append(
+            {
+                "role": "function",
+                "name": function_name,
+                "content": str(function_response),
+            }
+        )
+        return True
+
+    def _run_tool_calls_ollama(self, tool_calls):
+        """执行ollama模型请求的工具调用, 并将调用过程追加到上下文
+
+        Args:
+            tool_calls (list): 模型回复中的tool_calls
+        """
+        for tool_call in tool_calls:
+            function_name = tool_call["function"]["name"]
+            function_args = tool_call["function"]["arguments"]
+            if function_name not in self.function_map:
+                logger.warning(f"模型请求了未注册的函数: {function_name}")
+                continue
+            # 执行函数调用
+            logger.debug(
+                f"FunctionCall模块执行函数调用: {function_name}: {function_args}"
+            )
+            function_response = self.function_map[function_name](**function_args)
+            # 生成唯一调用ID
+            call_id = str(uuid.uuid4())
+            # 助手消息
+            self.chat_model.messages.append(
+                {
+                    "role": "assistant",
+                    "content": "",
+                    "tool_calls": [
+                        {
+                            "id": call_id,
+                            "type": "function",
+                            "function": {
+                                "name": function_name,
+                                "arguments": function_args,
+                            },
+                        }
+                    ],
+                }
+            )
+            # 工具响应消息
+            self.chat_model.messages.append(
+                {
+                    "role": "tool",
+                    "content": json.dumps(
+                        {
+                            "status": "success",
+                            "data": function_response,
+                        },
+                        ensure_ascii=False,
+                    ),
+                    "tool_call_id": call_id,
+                }
+            )
+
     def get_response(self, user_name: str, user_input: str) -> str:
         # 先发送用户消息给LLM
         self.chat_model.add_message("user", user_name, user_input)
@@ -78,75 +167,42 @@ class FunctioncallManager:
         if self.model_frame_type == "openaiType":
             response = self.chat_model.client.chat.completions.create(
                 model=self.chat_model.model,
-                messages=self.chat_model.messages,
+                messages=self.chat_model.build_messages(),
                 functions=self.functions,
                 function_call="auto",
                 stream=False,
             )
             message = response.choices[0].message
 
-            if message.function_call:
-                # 如果LLM进行函数调用，执行相应的函数
-                function_name = message.function_call.name
-                function_args = json.loads(message.function_call.arguments)
-
-                if function_name in self.function_map:
-                    # 执行函数调用
-                    logger.debug(
-                        f"FunctionCall模块执行函数调用: {function_name}: {function_args}"
-                    )
-                    function_response = self.function_map[function_name](
-                        **function_args
-                    )
-                    self.chat_model.messages.append(
-                        {
-                            "role": "assistant",
-                            "content": "",
-                            "function_call": {
-                                "name": function_name,
-                                "arguments": message.function_call.arguments,
-                            },
-                        }
-                    )
-                    self.chat_model.messages.append(
-                        {
-                            "role": "function",
-                            "name": function_name,
-                            "content": str(function_response),
-                        }
-                    )
-                    second_response = self.chat_model.client.chat.completions.create(
-                        model=self.chat_model.model,
-                        messages=self.chat_model.messages,
-                        stream=False,
-                    )
-                    final_response = second_response.choices[0].message.content
-                    self.chat_model.add_message(
-                        "assistant", self.chat_model.bot_name, final_response
-                    )
-                    return final_response
+            if message.function_call and self._run_function_openai(
+                message.function_call.name, message.function_call.arguments
+            ):
+                # 如果LLM进行函数调用，执行相应的函数后再次请求模型
+                second_response = self.chat_model.client.chat.completions.create(
+                    model=self.chat_model.model,
+                    messages=self.chat_model.build_messages(),
+                    stream=False,
+                )
+                final_response = self.chat_model.remove_think_tags(
+                    second_response.choices[0].message.content or ""
+                )
+                self.chat_model.add_message(
+                    "assistant", self.chat_model.bot_name, final_response
+                )
+                return final_response
             else:
                 response_content = message.content
 
         elif self.model_frame_type == "ollama":
-            _tools = []
-            for _func in self.functions:
-                _tools.append(
-                    {
-                        "type": "function",
-                        "function": _func,
-                    }
-                )
-
             try:
                 response = ollama.chat(
                     model=self.chat_model.model,
-                    messages=self.chat_model.messages,
+                    messages=self.chat_model.build_messages(),
                     options={
                         "temperature": self.chat_model.temperature,
                         "max_tokens": self.chat_model.max_tokens,
                     },
-                    tools=_tools,
+                    tools=self._ollama_tools(),
                 )
                 message = response.get("message", {})
                 logger.debug(f"response: {message}")
@@ -154,63 +210,19 @@ class FunctioncallManager:
                 return f"API请求错误: {str(e)}"
 
             if "tool_calls" in message:
-                for tool_call in message["tool_calls"]:
-                    function_name = tool_call["function"]["name"]
-                    function_args = tool_call["function"]["arguments"]
-                    print(f"函数名称: {function_name}")
-                    print(f"参数: {function_args}")
-
-                    if function_name in self.function_map:
-                        # 执行函数调用
-                        logger.debug(
-                            f"FunctionCall模块执行函数调用: {function_name}: {function_args}"
-                        )
-                        function_response = self.function_map[function_name](
-                            **function_args
-                        )
-                        # 生成唯一调用ID
-                        call_id = str(uuid.uuid4())
-                        # 助手消息
-                        self.chat_model.messages.append(
-                            {
-                                "role": "assistant",
-                                "content": "",
-                                "tool_calls": [
-                                    {
-                                        "id": call_id,
-                                        "type": "function",
-                                        "function": {
-                                            "name": function_name,
-                                            "arguments": function_args,
-                                        },
-                                    }
-                                ],
-                            }
-                        )
-                        # 工具响应消息
-                        self.chat_model.messages.append(
-                            {
-                                "role": "tool",
-                                "content": json.dumps(
-                                    {
-                                        "status": "success",
-                                        "data": function_response,
-                                    },
-                                    ensure_ascii=False,
-                                ),
-                                "tool_call_id": call_id,
-                            }
-                        )
+                self._run_tool_calls_ollama(message["tool_calls"])
 
                 second_response = ollama.chat(
                     model=self.chat_model.model,
-                    messages=self.chat_model.messages,
+                    messages=self.chat_model.build_messages(),
                     options={
                         "temperature": self.chat_model.temperature,
                         "max_tokens": self.chat_model.max_tokens,
                     },
                 )
-                final_response = second_response.get("message", {}).get("content", "")
+                final_response = self.chat_model.remove_think_tags(
+                    second_response.get("message", {}).get("content", "")
+                )
                 self.chat_model.add_message(
                     "assistant", self.chat_model.bot_name, final_response
                 )
@@ -218,11 +230,141 @@ class FunctioncallManager:
             else:
                 response_content = message.get("content", "")
 
+        # 推理内容不写入上下文与历史记录
+        response_content = self.chat_model.remove_think_tags(response_content or "")
         self.chat_model.add_message(
             "assistant", self.chat_model.bot_name, response_content
         )
         return response_content
 
+    def _stream_openai(self, function_call=None, think_filter=None, **kwargs):
+        """流式请求openaiType模型, 逐块返回回复文本
+
+        Args:
+            function_call (dict, optional): 传入时收集模型请求的函数调用 (name/arguments). Defaults to None.
+            think_filter (ThinkTagFilter, optional): 传入时统计通过独立字段返回的推理内容. Defaults to None.
+        """
+        stream = self.chat_model.client.chat.completions.create(
+            model=self.chat_model.model,
+            messages=self.chat_model.build_messages(),
+            stream=True,
+            **kwargs,
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            reasoning_content = getattr(delta, "reasoning_content", None)
+            if think_filter is not None and reasoning_content:
+                think_filter.add_reasoning(reasoning_content)
+            if function_call is not None and delta.function_call:
+                # 函数调用的名称与参数分散在多个数据块中
+                if delta.function_call.name:
+                    function_call["name"] = delta.function_call.name
+                if delta.function_call.arguments:
+                    function_call["arguments"] = (
+                        function_call.get("arguments", "")
+                        + delta.function_call.arguments
+                    )
+            elif delta.content:
+                yield delta.content
+
+    def _stream_ollama(self, tool_calls=None, **kwargs):
+        """流式请求ollama模型, 逐块返回回复文本
+
+        Args:
+            tool_calls (list, optional): 传入时收集模型请求的工具调用. Defaults to None.
+        """
+        stream = ollama.chat(
+            model=self.chat_model.model,
+            messages=self.chat_model.build_messages(),
+            options={
+                "temperature": self.chat_model.temperature,
+                "max_tokens": self.chat_model.max_tokens,
+            },
+            stream=True,
+            **kwargs,
+        )
+        for chunk in stream:
+            message = chunk.get("message", {})
+            if tool_calls is not None and message.get("tool_calls"):
+                tool_calls.extend(message["tool_calls"])
+            content = message.get("content", "")
+            if content:
+                yield content
+
+    @staticmethod
+    def _filter_think(think_filter, chunks):
+        """过滤流式回复中的推理内容, 只返回非空的可显示文本"""
+        for chunk in chunks:
+            content = think_filter.feed(chunk)
+            if content:
+                yield content
+
+    def get_response_streaming(
+        self, user_name: str, user_input: str
+    ) -> Generator[str, None, None]:
+        """获取模型回复 (流式, 支持函数调用)
+
+        模型请求函数调用时先执行函数, 再流式返回第二次请求的回复.
+        完整回复在生成结束后写入上下文与历史记录.
+
+        Args:
+            user_name (str): 用户名称
+            user_input (str): 用户输入
+
+        Yields:
+            Generator[str, None, None]: 流式回复结果
+        """
+        self.chat_model.add_message("user", user_name, user_input)
+        full_response = ""
+        # 推理内容不显示/朗读, 也不写入上下文与历史记录
+        think_filter = ThinkTagFilter()
+        try:
+            if self.model_frame_type == "openaiType":
+                function_call = {}
+                chunks = self._stream_openai(
+                    function_call,
+                    think_filter,
+                    functions=self.functions,
+                    function_call="auto",
+                )
+                for content in self._filter_think(think_filter, chunks):
+                    full_response += content
+                    yield content
+                if function_call.get("name") and self._run_function_openai(
+                    function_call["name"], function_call.get("arguments", "")
+                ):
+                    chunks = self._stream_openai(think_filter=think_filter)
+                    for content in self._filter_think(think_filter, chunks):
+                        full_response += content
+                        yield content
+
+            elif self.model_frame_type == "ollama":
+                tool_calls = []
+                chunks = self._stream_ollama(tool_calls, tools=self._ollama_tools())
+                for content in self._filter_think(think_filter, chunks):
+                    full_response += content
+                    yield content
+                if tool_calls:
+                    self._run_tool_calls_ollama(tool_calls)
+                    chunks = self._stream_ollama()
+                    for content in self._filter_think(think_filter, chunks):
+                        full_response += content
+                        yield content
+
+            content = think_filter.close()
+            if content:
+                full_response += content
+                yield content
+            if self.chat_model.think_metrics:
+                think_filter.report()
+            self.chat_model.add_message(
+                "assistant", self.chat_model.bot_name, full_response
+            )
+        except Exception as e:
+            yield f"API请求错误: {str(e)}"
+
 
 if __name__ == "__main__":
     import yaml
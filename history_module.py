@@ -30,6 +30,14 @@ class DialogueHistory:
                           content TEXT NOT NULL,
                           timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)"""
             )
+            # 对话摘要 (较早的对话被压缩为摘要, last_record_id之前的记录不再直接加载)
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS dialogue_summary
+                         (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                          content TEXT NOT NULL,
+                          last_record_id INTEGER NOT NULL,
+                          timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)"""
+            )
 
     def _get_conn(self):
         """获取新数据库连接"""
@@ -125,15 +133,86 @@ class DialogueHistory:
             logger.error(f"清空失败: {str(e)}")
             self.conn.rollback()
 
+    def get_records_after(self, record_id: int, limit: int = 0) -> List[Dict]:
+        """按时间顺序获取指定记录之后的历史记录"""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                query = """SELECT id, role, user_name, content, timestamp
+                           FROM dialogue_history WHERE id > ? ORDER BY id ASC"""
+                if limit > 0:
+                    query += f" LIMIT {limit}"
+                cursor.execute(query, (record_id,))
+                return [
+                    dict(zip(["id", "role", "user_name", "content", "timestamp"], row))
+                    for row in cursor.fetchall()
+                ]
+        except sqlite3.Error as e:
+            logger.error(f"查询失败: {str(e)}")
+            return []
+
+    def count_records_after(self, record_id: int) -> int:
+        """统计指定记录之后的历史记录数"""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT COUNT(*) FROM dialogue_history WHERE id > ?", (record_id,)
+                )
+                return cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error(f"查询失败: {str(e)}")
+            return 0
+
+    def get_summary(self) -> Dict:
+        """获取最新的对话摘要, 没有摘要时返回None"""
+        try:
+            with self._get_conn() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """SELECT id, content, last_record_id, timestamp
+                       FROM dialogue_summary ORDER BY id DESC LIMIT 1"""
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+                return dict(zip(["id", "content", "last_record_id", "timestamp"], row))
+        except sqlite3.Error as e:
+            logger.error(f"查询失败: {str(e)}")
+            return None
+
+    def add_summary(self, content: str, last_record_id: int):
+        """保存对话摘要 (摘要覆盖last_record_id及之前的全部记录)"""
+        try:
+            with self._get_conn() as conn:
+                conn.execute(
+                    """INSERT INTO dialogue_summary (content, last_record_id)
+                       VALUES (?, ?)""",
+                    (content, last_record_id),
+                )
+        except sqlite3.Error as e:
+            logger.error(f"数据库操作失败: {str(e)}")
+
     def load_history_to_messages(self) -> List[Dict]:
-        """加载格式化历史记录"""
-        records = self.get_records()
-        return [
+        """加载格式化历史记录 (已被摘要覆盖的记录以摘要代替)"""
+        summary = self.get_summary()
+        if summary is None:
+            records = reversed(self.get_records())
+            messages = []
+        else:
+            records = self.get_records_after(summary["last_record_id"])
+            messages = [
+                {
+                    "role": "system",
+                    "content": "[此前对话的摘要]\n" + summary["content"],
+                }
+            ]
+        return messages + [
             {
                 "role": r["role"],
                 "content": r["content"],
             }
-            for r in reversed(records)
+            for r in records
         ]
 
     def close(self):
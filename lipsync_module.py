@@ -1,7 +1,7 @@
 # lipsynv_module.py
 # 音频响度检测实现口型同步, 源代码见live2d-py仓库: https://github.com/Arkueid/live2d-py/blob/main/package/live2d/utils/lipsync.py
 
-import wave
+import wave, threading
 import time
 import numpy as np
 from io import BytesIO
@@ -11,82 +11,125 @@ import logging
 logger = logging.getLogger("lipsync_module")
 
 
-class WavHandler:
-    def __init__(self):
-        # 每个通道的采样帧数
-        self.numFrames: int = 0
-        # 采样率，帧/秒
-        self.sampleRate: int = 0
-        self.sampleWidth: int = 0
-        # 通道数
-        self.numChannels: int = 0
-        # 数据
-        self.pcmData: np.ndarray = None
-        # 已经读取的帧数
-        self.lastOffset: int = 0
-        # 当前rms值
-        self.currentRms: float = 0
-        # 开始读取的时间
-        self.startTime: float = -1
-
-    def Start(self, audio_data: bytes) -> None:
-        """接收并处理音频数据
+class LipSyncEnvelope:
+    """预计算的口型响度包络 (线程安全)
+
+    音频加载(或流式追加)时按固定帧率一次性向量化计算RMS包络,
+    渲染线程按播放时钟查询并线性插值, 无需逐帧重新计算响度或跨线程发送信号.
+    """
+
+    def __init__(self, frame_rate: int = 100):
+        """
+        Args:
+            frame_rate (int, optional): 包络帧率(帧/秒). Defaults to 100.
+        """
+        self.frame_rate = frame_rate
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """清空包络, 口型归零"""
+        with self._lock:
+            self.sampleRate: int = 0
+            self.numChannels: int = 1
+            self.numFrames: int = 0  # 已追加的采样帧数
+            self.envelope = np.zeros(0, dtype=np.float32)  # 每个包络帧的RMS
+            self.peak: float = 0.0  # 已追加数据的峰值, 用于归一化
+            self._pending = np.zeros(0, dtype=np.float32)  # 不足一个包络帧的剩余采样
+            self._clock = None
+            self._startTime: float = 0.0
+            self.active: bool = False
+
+    def start(self, sample_rate: int, num_channels: int, clock=None) -> None:
+        """开始新的音频 (16位PCM), 数据通过append追加
+
+        Args:
+            sample_rate (int): 采样率
+            num_channels (int): 通道数
+            clock (callable, optional): 返回当前播放位置(秒)的函数, 默认按开始后经过的时间计算
+        """
+        self.reset()
+        with self._lock:
+            self.sampleRate = sample_rate
+            self.numChannels = num_channels
+            self._clock = clock
+            self._startTime = time.perf_counter()
+            self.active = True
+
+    def load(self, audio_data: bytes, clock=None) -> None:
+        """加载完整的wav音频并计算包络
 
         Args:
-            audio_data (bytes): 音频序列
+            audio_data (bytes): wav音频序列
+            clock (callable, optional): 返回当前播放位置(秒)的函数
         """
-        self.ReleasePcmData()
         try:
-            audio_stream = BytesIO(audio_data)
-            with wave.open(audio_stream, "rb") as wav:
-                self.numFrames = wav.getnframes()
-                self.sampleRate = wav.getframerate()
-                self.sampleWidth = wav.getsampwidth()
-                self.numChannels = wav.getnchannels()
-                self.pcmData = np.frombuffer(
-                    wav.readframes(self.numFrames), dtype=np.int16
-                )
-                self.pcmData = self.pcmData / np.max(np.abs(self.pcmData))
-                self.pcmData = self.pcmData.reshape(-1, self.numChannels).T
-                self.startTime = time.time()
-                self.lastOffset = 0
+            with wave.open(BytesIO(audio_data), "rb") as wav:
+                self.start(wav.getframerate(), wav.getnchannels(), clock)
+                self.append(wav.readframes(wav.getnframes()))
         except Exception as e:
-            self.ReleasePcmData()
+            self.reset()
             logger.error(f"音频数据加载失败: {e}")
 
-    def ReleasePcmData(self):
-        """释放pcm数据"""
-        if self.pcmData is not None:
-            del self.pcmData
-            self.pcmData = None
+    def append(self, pcm: bytes) -> None:
+        """追加16位PCM数据, 对其中完整的包络帧向量化计算RMS
 
-    def GetRms(self) -> float:
-        """返回语音响度数据
+        Args:
+            pcm (bytes): 16位PCM数据
+        """
+        data = np.frombuffer(pcm, dtype=np.int16).reshape(-1, self.numChannels)
+        if not self.active or not len(data):
+            return
+        samples = np.concatenate((self._pending, data.mean(axis=1, dtype=np.float32)))
+        hop = max(1, self.sampleRate // self.frame_rate)
+        usable = len(samples) - len(samples) % hop
+        frames = samples[:usable].reshape(-1, hop)
+        rms = np.sqrt(np.mean(np.square(frames), axis=1))
+        with self._lock:
+            self.peak = max(self.peak, float(np.max(np.abs(data))))
+            self.envelope = np.concatenate((self.envelope, rms))
+            self._pending = samples[usable:]
+            self.numFrames += len(data)
 
-        Returns:
-            float: 语音响度, 范围[0,1]
+    @property
+    def duration(self) -> float:
+        """已追加音频的时长(秒)"""
+        return self.numFrames / self.sampleRate if self.sampleRate else 0.0
+
+    def resync(self, position: float) -> None:
+        """将默认时钟对齐到指定的播放位置 (播放中断后继续播放时调用)
+
+        Args:
+            position (float): 当前播放位置(秒)
         """
-        return self.currentRms
+        with self._lock:
+            self._startTime = time.perf_counter() - position
 
-    def Update(self) -> bool:
-        """更新音频帧位置，并计算当前音频段的 RMS
+    def stop(self) -> None:
+        """播放结束, 口型归零"""
+        with self._lock:
+            self.active = False
+
+    def value(self) -> float:
+        """按播放时钟插值得到当前响度
 
         Returns:
-            bool: 返回是否更新成功
+            float: 语音响度, 范围[0,1]
         """
-        if self.pcmData is None or self.lastOffset >= self.numFrames:
-            return False
-
-        currentTime = time.time() - self.startTime
-        currentOffset = int(currentTime * self.sampleRate)
-
-        if currentOffset == self.lastOffset:
-            return True
-
-        currentOffset = min(currentOffset, self.numFrames)
-        dataFragment = self.pcmData[:, self.lastOffset : currentOffset].astype(
-            np.float32
-        )
-        self.currentRms = np.sqrt(np.mean(np.square(dataFragment)))
-        self.lastOffset = currentOffset
-        return True
+        with self._lock:
+            if not self.active or not len(self.envelope) or self.peak <= 0:
+                return 0.0
+            if self._clock is not None:
+                position = self._clock()
+            else:
+                position = time.perf_counter() - self._startTime
+            # 包络帧的值对应帧中心时刻
+            index = position * self.frame_rate - 0.5
+            if index < -0.5 or index > len(self.envelope) - 0.5:
+                return 0.0
+            i0 = int(np.floor(index))
+            frac = index - i0
+            last = len(self.envelope) - 1
+            rms = self.envelope[min(max(i0, 0), last)] * (1 - frac)
+            rms += self.envelope[min(max(i0 + 1, 0), last)] * frac
+            return min(1.0, float(rms) / self.peak)
@@ -5,7 +5,6 @@ from OpenGL.GL import *
 from OpenGL.GLUT import *
 import live2d.v3 as live2d
 from live2d.v3 import StandardParams
-from lipsync_module import WavHandler
 import logging
 from logging_config import gcww
 
@@ -27,9 +26,9 @@ class Live2DWidget(QOpenGLWidget):
         self.lipSyncN = gcww(main_settings, "live2d_lipSyncN", 5, logger)
         # 设置透明背景
         self.setAttribute(Qt.WA_TranslucentBackground, True)
-        # 初始化响度检测模块
-        self.wavHandler = WavHandler()
         self.mouth_open_y = 0.0
+        # 口型响度来源 (LipSyncEnvelope), 每帧按播放时钟查询
+        self.lipsync_source = None
         # 配置显示刷新
         self.update_scene_timer = QTimer(self)  # 定时器
         self.update_scene_timer.timeout.connect(lambda: self.update())
@@ -66,6 +65,8 @@ class Live2DWidget(QOpenGLWidget):
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)  # 清除颜色缓冲并设置透明背景
         if self.model:
             self.model.Update()  # 更新模型
+            if self.lipsync_source is not None:
+                self.set_mouth_open_y(self.lipsync_source.value())
             self.model.SetParameterValue(
                 StandardParams.ParamMouthOpenY,
                 self.mouth_open_y * self.lipSyncN,
@@ -83,6 +84,14 @@ class Live2DWidget(QOpenGLWidget):
         mouth_open_y = min(1, mouth_open_y)
         self.mouth_open_y = mouth_open_y
 
+    def set_lipsync_source(self, lipsync_source):
+        """设置口型响度来源, 渲染时按播放时钟插值得到口型 (无需逐帧发送信号)
+
+        Args:
+            lipsync_source (LipSyncEnvelope): 口型响度包络
+        """
+        self.lipsync_source = lipsync_source
+
     def play_motion(self, motion_name):
         """播放live2d动作
 
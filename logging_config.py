@@ -59,6 +59,21 @@ def setup_logging():
                 "level": "DEBUG",
                 "propagate": False,
             },
+            "audioOutput_module": {
+                "handlers": ["console", "file"],
+                "level": "DEBUG",
+                "propagate": False,
+            },
+            "vitsClient_module": {
+                "handlers": ["console", "file"],
+                "level": "DEBUG",
+                "propagate": False,
+            },
+            "ttsCache_module": {
+                "handlers": ["console", "file"],
+                "level": "DEBUG",
+                "propagate": False,
+            },
             "lettaModel_module": {
                 "handlers": ["console", "file"],
                 "level": "DEBUG",
@@ -79,11 +94,41 @@ def setup_logging():
                 "level": "DEBUG",
                 "propagate": False,
             },
+            "asrBackend_module": {
+                "handlers": ["console", "file"],
+                "level": "DEBUG",
+                "propagate": False,
+            },
+            "audioBuffer_module": {
+                "handlers": ["console", "file"],
+                "level": "DEBUG",
+                "propagate": False,
+            },
+            "vad_module": {
+                "handlers": ["console", "file"],
+                "level": "DEBUG",
+                "propagate": False,
+            },
+            "speakerTracker_module": {
+                "handlers": ["console", "file"],
+                "level": "DEBUG",
+                "propagate": False,
+            },
             "vpr_module": {
                 "handlers": ["console", "file"],
                 "level": "DEBUG",
                 "propagate": False,
             },
+            "vprIndex_module": {
+                "handlers": ["console", "file"],
+                "level": "DEBUG",
+                "propagate": False,
+            },
+            "voiceprintStore_module": {
+                "handlers": ["console", "file"],
+                "level": "DEBUG",
+                "propagate": False,
+            },
             "live2d_module": {
                 "handlers": ["console", "file"],
                 "level": "DEBUG",
@@ -119,6 +164,21 @@ def setup_logging():
                 "level": "DEBUG",
                 "propagate": False,
             },
+            "dialogueSummary_module": {
+                "handlers": ["console", "file"],
+                "level": "DEBUG",
+                "propagate": False,
+            },
+            "contextWindow_module": {
+                "handlers": ["console", "file"],
+                "level": "DEBUG",
+                "propagate": False,
+            },
+            "thinkFilter_module": {
+                "handlers": ["console", "file"],
+                "level": "DEBUG",
+                "propagate": False,
+            },
         },
     }
 
@@ -1,9 +1,10 @@
 # main.py
 
 import sys, yaml
+from functools import partial
 from PyQt5.QtCore import QThread, pyqtSignal, QTimer
 from PyQt5.QtWidgets import QApplication
-from replyParser_module import replyParser  # 导入回复内容解析器
+from replyParser_module import replyParser, StreamingReplyParser  # 导入回复内容解析器
 import logging, logging_config
 from logging_config import gcww
 
@@ -23,13 +24,29 @@ class ChatModelWorker(QThread):
     """用于后台运行模型的线程"""
 
     response_ready = pyqtSignal(object)
-
-    def __init__(self, model, mem_module, user_name, input_text):
+    expression_ready = pyqtSignal(str)  # 流式生成时, 回复的表情部分已生成
+    text_ready = pyqtSignal(str)  # 流式生成时, 当前已生成的中文回复
+    speech_ready = pyqtSignal(str)  # 流式生成时, 日语回复中已生成完整的句子
+
+    def __init__(
+        self,
+        model,
+        mem_module,
+        user_name,
+        input_text,
+        streaming=False,
+        reply_schema="ep_zh_jp",
+    ):
         super().__init__()
         self.model = model
         self.mem_module = mem_module
         self.user_name = user_name
         self.input_text = input_text
+        # 仅当模型框架实现了流式接口时使用流式生成, 回复由增量解析器边生成边解析
+        if streaming and hasattr(model, "get_response_streaming"):
+            self.parser = StreamingReplyParser(schema=reply_schema)
+        else:
+            self.parser = None
 
     def run(self):
         try:
@@ -38,13 +55,39 @@ class ChatModelWorker(QThread):
                     self.mem_module.recall_mem(self.user_name, self.input_text)
                     + self.input_text
                 )
-            response = self.model.get_response(self.user_name, self.input_text)
+            if self.parser is not None:
+                response = ""
+                for chunk in self.model.get_response_streaming(
+                    self.user_name, self.input_text
+                ):
+                    response += chunk
+                    self.emit_events(self.parser.feed(chunk))
+                self.emit_events(self.parser.close())
+            else:
+                response = self.model.get_response(self.user_name, self.input_text)
             logger.debug(f"rsp: {response}")
             self.response_ready.emit(response)
         except Exception as e:
             logger.error(f"Error in model worker: {e}")
             self.response_ready.emit({"error": str(e)})
 
+    def emit_events(self, events):
+        """将增量解析器产生的事件转为信号
+
+        Args:
+            events (list): 解析事件, 元素为(类型, 内容)
+        """
+        text_updated = False
+        for kind, value in events:
+            if kind == "ep":
+                self.expression_ready.emit(value)
+            elif kind == "zh":
+                text_updated = True
+            elif kind == "jp":
+                self.speech_ready.emit(value)
+        if text_updated:
+            self.text_ready.emit(self.parser.data["zh"].strip())
+
 
 class MemoryRecordWorker(QThread):
     """记忆记录非阻塞实现"""
@@ -118,19 +161,48 @@ class MainApp:
         self.mem_module_open = gcww(self.settings, "mem0_switch", True, logger)
         if self.mem_module_open:  # 仅当开启mem0模块时才创建该对象
             self.mem_module = memModule(self.settings)
+        # 流式生成: 回复边生成边显示, 日语句子生成完整后立即合成语音
+        self.model_streaming = gcww(
+            self.settings, "model_streaming_switch", True, logger
+        )
+        # 回复格式 (日语在前或逐句交替时, 语音合成可以在中文生成完之前开始)
+        self.reply_schema = gcww(self.settings, "reply_schema", "ep_zh_jp", logger)
+        self._reply_started = False  # 本轮回复是否已收到第一块内容
+        self._reply_shown = False  # 本轮回复是否已开始显示
+        self._reply_spoken = False  # 本轮回复是否已开始朗读
+        self._reply_generation = 0  # 本轮回复开始时的语音轮次编号 (用户插话后不再一致)
         # "思考中..."动态效果初始化
         self.typing_animation_timer = QTimer()
         self.typing_dots = ""
+        # 填充语音: 模型回复超过等待时间仍未返回时, 播放预合成的简短应答掩盖等待
+        self.filler_switch = gcww(self.settings, "vits_filler_switch", True, logger)
+        self.filler_delay_time = gcww(
+            self.settings, "vits_filler_delay_time", 1.5, logger
+        )
+        self.filler_timer = QTimer()
+        self.filler_timer.setSingleShot(True)
+        self.filler_timer.timeout.connect(
+            self.window.recognizer.vits_speaker.play_filler
+        )
+        if self.filler_switch:
+            self.window.recognizer.vits_speaker.prefetch_fillers(
+                gcww(
+                    self.settings,
+                    "vits_filler_phrases",
+                    ["えっと…", "うーん、そうだね…", "ちょっと待ってね"],
+                    logger,
+                )
+            )
         # 显示UI界面
         self.setup_ui()
         # vitsSpeaker连接槽
         self.window.recognizer.vits_speaker.audio_start_play.connect(
             self.start_voice_rec
         )
-        # 针对live2d显示模式绑定口型同步信号
+        # 针对live2d显示模式绑定口型同步来源 (渲染时按播放时钟查询口型包络)
         if self.window.character_display_mode == "live2d":
-            self.window.recognizer.vits_speaker.audio_lipsync_signal.connect(
-                self.window.live2d_widget.set_mouth_open_y
+            self.window.live2d_widget.set_lipsync_source(
+                self.window.recognizer.vits_speaker.lipsync
             )
 
     def setup_ui(self):
@@ -216,14 +288,35 @@ class MainApp:
             # 启动后台线程调用模型
             if self.mem_module_open:
                 self.worker = ChatModelWorker(
-                    self.chat_model, self.mem_module, user_name, input_text
+                    self.chat_model,
+                    self.mem_module,
+                    user_name,
+                    input_text,
+                    self.model_streaming,
+                    self.reply_schema,
                 )
             else:  # 没有启用mem0模块, 传入None
                 self.worker = ChatModelWorker(
-                    self.chat_model, None, user_name, input_text
+                    self.chat_model,
+                    None,
+                    user_name,
+                    input_text,
+                    self.model_streaming,
+                    self.reply_schema,
                 )
-            self.worker.response_ready.connect(self.on_model_response)
-            self.worker.start()
+            self._reply_started = False
+            self._reply_shown = False
+            self._reply_spoken = False
+            self._reply_generation = self.window.recognizer.vits_speaker.reply_generation
+            # 槽函数绑定发出信号的线程, 旧一轮仍在生成的回复不会进入界面与语音
+            worker = self.worker
+            worker.expression_ready.connect(partial(self.on_model_expression, worker))
+            worker.text_ready.connect(partial(self.on_model_text, worker))
+            worker.speech_ready.connect(partial(self.on_model_speech, worker))
+            worker.response_ready.connect(partial(self.on_model_response, worker))
+            worker.start()
+            if self.filler_switch:  # 等待超时后播放填充语音
+                self.filler_timer.start(int(self.filler_delay_time * 1000))
 
     def start_typing_animation(self):
         """启动动态省略号动画"""
@@ -247,22 +340,109 @@ class MainApp:
         self.typing_animation_timer.stop()
         self.typing_animation_timer.timeout.disconnect(self.update_typing_animation)
 
-    def on_model_response(self, response):  # ATTENTION 模型回复处理部分
+    def reply_interrupted(self):
+        """本轮回复是否已被用户插话打断 (打断后不再切换表情和朗读剩余内容)"""
+        return (
+            self.window.recognizer.vits_speaker.reply_generation
+            != self._reply_generation
+        )
+
+    def start_streaming_reply(self):
+        """流式生成时收到本轮回复的第一个解析结果"""
+        if not self._reply_started:
+            self._reply_started = True
+            self.stop_typing_animation()  # 停止动态省略号动画
+            self.filler_timer.stop()  # 回复已开始, 不再播放填充语音
+
+    def on_model_expression(self, worker, expression):
+        """流式生成时表情部分已生成, 立即切换角色表情
+
+        Args:
+            worker (ChatModelWorker): 发出信号的模型线程
+            expression (str): 表情或动作名称
+        """
+        if worker is not self.worker:  # 已被新一轮对话取代
+            return
+        self.start_streaming_reply()
+        if self.reply_interrupted():
+            return
+        logger.debug(f"tachie_expression: {expression}")
+        self.change_emotion(expression)
+
+    def on_model_text(self, worker, chinese):
+        """流式生成时实时显示已生成的中文回复
+
+        Args:
+            worker (ChatModelWorker): 发出信号的模型线程
+            chinese (str): 当前已生成的中文回复
+        """
+        if worker is not self.worker:
+            return
+        self.start_streaming_reply()
+        if self._reply_shown:
+            self.window.update_display_text(chinese)
+        else:
+            self._reply_shown = True
+            self.window.display_text(chinese, is_non_user_input=True)
+
+    def on_model_speech(self, worker, sentence):
+        """流式生成时朗读已生成完整的日语句子 (本轮第一句打断之前的播放, 之后排队播放)
+
+        Args:
+            worker (ChatModelWorker): 发出信号的模型线程
+            sentence (str): 日语句子
+        """
+        if worker is not self.worker:
+            return
+        self.start_streaming_reply()
+        if self.reply_interrupted():
+            logger.debug(f"回复已被插话打断, 不再朗读: {sentence}")
+            return
+        logger.debug(f"Japanese_sentence: {sentence}")
+        self.window.recognizer.vits_speaker.vits_play(
+            sentence, interrupt=not self._reply_spoken
+        )
+        self._reply_spoken = True
+
+    def on_model_response(self, worker, response):  # ATTENTION 模型回复处理部分
         """处理模型的回复, 解析提取出有效内容
 
         Args:
+            worker (ChatModelWorker): 发出信号的模型线程
             response (str): 模型原始回复内容
         """
-        self.stop_typing_animation()  # 停止动态省略号动画
-        final_message = self.parse_response(response)
-        self.window.display_text(final_message, is_non_user_input=True)
+        if worker is not self.worker:
+            logger.debug("上一轮对话的回复已被新一轮对话取代, 不再处理")
+            return
+        parser = worker.parser
+        if parser is not None and isinstance(response, str):
+            # 流式生成时表情与语音已在生成过程中处理, 这里只取最终的中文回复
+            parsed_reply = parser.result()
+            final_message = parsed_reply.get("data").get("zh")
+            if parsed_reply.get("status"):
+                logger.warning(f"流式回复解析异常: {parsed_reply.get('message')}")
+                # 缺少中文部分时退而显示日语内容
+                final_message = (
+                    final_message
+                    or parsed_reply.get("data").get("jp")
+                    or parsed_reply.get("message")
+                )
+        else:
+            final_message = self.parse_response(response)
+        if not self._reply_started:
+            self.stop_typing_animation()  # 停止动态省略号动画
+            self.filler_timer.stop()  # 回复已到达, 不再播放填充语音
+        if self._reply_shown:
+            self.window.update_display_text(final_message)
+        else:
+            self.window.display_text(final_message, is_non_user_input=True)
         if self.mem_module_open:  # 判断是否开启mem0模块
             # 非阻塞的记忆记录
             self.mem_record_worker = MemoryRecordWorker(self.mem_module, final_message)
             self.mem_record_worker.start()
 
     def parse_response(self, msg):
-        """对模型回复{表情}|||{中文}|||{日语}进行解析
+        """对模型回复{表情}|||{中文}|||{日语}进行解析 (字段顺序由reply_schema决定)
 
         Args:
             msg (str): 模型原始回复
@@ -270,7 +450,7 @@ class MainApp:
         Returns:
             str: 中文回复文本
         """
-        parsed_reply = replyParser(msg)
+        parsed_reply = replyParser(msg, schema=self.reply_schema)
         parse_status = parsed_reply.get("status")
         parse_message = parsed_reply.get("message")
 
@@ -285,11 +465,12 @@ class MainApp:
             logger.debug(f"Chinese_message: {Chinese_message}")
             logger.debug(f"Japanese_message: {Japanese_message}")
 
-            # 处理角色表情切换
-            self.change_emotion(tachie_expression)
+            if not self.reply_interrupted():  # 等待回复期间用户已插话时只显示文本
+                # 处理角色表情切换
+                self.change_emotion(tachie_expression)
 
-            # 播放语音, 默认日语
-            self.window.recognizer.vits_speaker.vits_play(Japanese_message)
+                # 播放语音, 默认日语
+                self.window.recognizer.vits_speaker.vits_play(Japanese_message)
 
         return Chinese_message
 
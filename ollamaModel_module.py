@@ -12,6 +12,10 @@ logger = logging.getLogger("ollamaModle_module")
 
 from time_module import DateTime
 from history_module import DialogueHistory
+from replyParser_module import get_reply_schema
+from thinkFilter_module import ThinkTagFilter
+from contextWindow_module import ContextWindow
+from dialogueSummary_module import DialogueCompactor
 
 
 class ollamaModel:
@@ -48,7 +52,6 @@ class ollamaModel:
     表情或动作包括：["自豪地显摆", "好奇地探身", "高兴wink", "害羞地认同", "温柔wink", "害羞地偷瞄", "严肃地否认或拒绝", "阴郁地躲闪", "火冒三丈", "娇媚地靠近", "温柔地否认或拒绝","微笑脸", "悲伤脸", "阴沉脸", "生气脸", "暴怒脸", "害羞脸", "羞愧脸"].
 
     请不要模仿用户的消息格式, 你的回复有另外的格式要求, 如下描述.
-    你的回答仅能包含以下内容："表情或动作 ||| 中文回复 ||| 日文翻译", 除此之外不应该输出任何多余内容.
     """
 
     def __init__(self, main_settings):
@@ -59,11 +62,22 @@ class ollamaModel:
         self.temperature = gcww(main_settings, "ollama_temperature", 0.74, logger)
         self.max_tokens = gcww(main_settings, "ollama_max_tokens", 8192, logger)
         self.bot_name = gcww(main_settings, "dialog_label", "assistant", logger)
-        self.messages = [{"role": "system", "content": self.SYSTEMPROMPT}]
+        # 是否记录推理模型<think>内容的字数与耗时
+        self.think_metrics = gcww(main_settings, "model_think_metrics", False, logger)
+        # 系统prompt末尾追加回复格式要求 (与回复解析使用同一个格式配置)
+        reply_schema = gcww(main_settings, "reply_schema", "ep_zh_jp", logger)
+        self.system_prompt = (
+            self.SYSTEMPROMPT + get_reply_schema(reply_schema)["prompt"] + "\n"
+        )
+        self.messages = [{"role": "system", "content": self.system_prompt}]
+        # 按token预算组装每次请求的上下文
+        self.context = ContextWindow(main_settings)
         self.formatted_dt = DateTime()
         # 加载历史记录
         self.history = DialogueHistory(main_settings)
         self.messages += self.history.load_history_to_messages()
+        # 历史对话超过阈值时在后台压缩为摘要
+        self.compactor = DialogueCompactor(main_settings, self.history, self.complete)
 
     def add_message(self, role: str, user_name: str, content: str):
         current_date_time = self.formatted_dt.get_formatted_current_datetime()
@@ -75,11 +89,45 @@ class ollamaModel:
             )
         else:
             formatted_content = content
+        # 新一轮对话开始前应用后台生成的摘要, 以摘要代替已被压缩的对话
+        if role == "user" and self.compactor.consume_update():
+            self.messages = self.messages[:1] + self.history.load_history_to_messages()
         # 添加到内存
         self.messages.append({"role": role, "content": formatted_content})
         # 持久化到数据库(不保存系统消息）
         if role != "system":
             self.history.add_record(role, user_name, formatted_content)
+        if role == "assistant":
+            self.compactor.maybe_compact()
+
+    def complete(self, messages) -> str:
+        """单次请求模型 (不使用也不写入对话上下文), 用于对话摘要等后台任务
+
+        Args:
+            messages (list): 请求消息列表
+
+        Returns:
+            str: 回复内容
+        """
+        response = ollama.chat(
+            model=self.model,
+            messages=messages,
+            options={
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens,
+            },
+            stream=False,
+        )
+        return self.remove_think_tags(response.get("message", {}).get("content", ""))
+
+    def build_messages(self):
+        """按上下文token预算组装本次请求的消息列表 (预算外的旧轮次从内存中移除)
+
+        Returns:
+            list: 本次请求的消息列表
+        """
+        request, self.messages = self.context.build(self.messages)
+        return request
 
     def get_response_streaming(
         self, user_name: str, user_input: str
@@ -90,7 +138,7 @@ class ollamaModel:
         try:
             response = ollama.chat(
                 model=self.model,
-                messages=self.messages,
+                messages=self.build_messages(),
                 options={
                     "temperature": self.temperature,
                     "max_tokens": self.max_tokens,
@@ -98,11 +146,20 @@ class ollamaModel:
                 stream=True  # 启用流式响应
             )
 
+            # 推理内容不显示/朗读, 也不写入上下文与历史记录
+            think_filter = ThinkTagFilter()
             for chunk in response:
                 content = chunk.get("message", {}).get("content", "")
+                content = think_filter.feed(content) if content else ""
                 if content:
                     full_response += content
                     yield content
+            content = think_filter.close()
+            if content:
+                full_response += content
+                yield content
+            if self.think_metrics:
+                think_filter.report()
 
             self.add_message("assistant", self.bot_name, full_response)
 
@@ -123,7 +180,7 @@ class ollamaModel:
         try:
             response = ollama.chat(
                 model=self.model,
-                messages=self.messages,
+                messages=self.build_messages(),
                 options={
                     "temperature": self.temperature,
                     "max_tokens": self.max_tokens,
@@ -132,8 +189,10 @@ class ollamaModel:
             )
 
             full_response = response.get("message", {}).get("content", "")
+            # 推理内容不写入上下文与历史记录
+            full_response = self.remove_think_tags(full_response)
             self.add_message("assistant", self.bot_name, full_response)
-            return self.remove_think_tags(full_response)
+            return full_response
 
         except Exception as e:
             return f"API请求错误: {str(e)}"
@@ -10,6 +10,10 @@ logger = logging.getLogger("openaiTypeModel_module")
 
 from time_module import DateTime
 from history_module import DialogueHistory
+from replyParser_module import get_reply_schema
+from thinkFilter_module import ThinkTagFilter
+from contextWindow_module import ContextWindow
+from dialogueSummary_module import DialogueCompactor
 
 
 class openaiTypeModel:
@@ -46,7 +50,6 @@ class openaiTypeModel:
     表情或动作包括：["自豪地显摆", "好奇地探身", "高兴wink", "害羞地认同", "温柔wink", "害羞地偷瞄", "严肃地否认或拒绝", "阴郁地躲闪", "火冒三丈", "娇媚地靠近", "温柔地否认或拒绝","微笑脸", "悲伤脸", "阴沉脸", "生气脸", "暴怒脸", "害羞脸", "羞愧脸"].
 
     请不要模仿用户的消息格式, 你的回复有另外的格式要求, 如下描述.
-    你的回答仅能包含以下内容："表情或动作 ||| 中文回复 ||| 日文翻译", 除此之外不应该输出任何多余内容.
     """
 
     def __init__(self, main_settings):
@@ -72,12 +75,23 @@ class openaiTypeModel:
         self.temperature = gcww(
             main_settings, "openai_type_model_temperature", 0, logger
         )
-        self.messages = [{"role": "system", "content": self.SYSTEMPROMPT}]
+        # 是否记录推理模型<think>内容的字数与耗时
+        self.think_metrics = gcww(main_settings, "model_think_metrics", False, logger)
+        # 系统prompt末尾追加回复格式要求 (与回复解析使用同一个格式配置)
+        reply_schema = gcww(main_settings, "reply_schema", "ep_zh_jp", logger)
+        self.system_prompt = (
+            self.SYSTEMPROMPT + get_reply_schema(reply_schema)["prompt"] + "\n"
+        )
+        self.messages = [{"role": "system", "content": self.system_prompt}]
+        # 按token预算组装每次请求的上下文
+        self.context = ContextWindow(main_settings)
         # 初始化时间工具
         self.formatted_dt = DateTime()
         # 加载历史记录
         self.history = DialogueHistory(main_settings)
         self.messages += self.history.load_history_to_messages()
+        # 历史对话超过阈值时在后台压缩为摘要
+        self.compactor = DialogueCompactor(main_settings, self.history, self.complete)
 
     def add_message(self, role: str, user_name: str, content: str):
         current_date_time = self.formatted_dt.get_formatted_current_datetime()
@@ -89,11 +103,42 @@ class openaiTypeModel:
             )
         else:
             formatted_content = content
+        # 新一轮对话开始前应用后台生成的摘要, 以摘要代替已被压缩的对话
+        if role == "user" and self.compactor.consume_update():
+            self.messages = self.messages[:1] + self.history.load_history_to_messages()
         # 添加到内存
         self.messages.append({"role": role, "content": formatted_content})
         # 持久化到数据库(不保存系统消息）
         if role != "system":
             self.history.add_record(role, user_name, formatted_content)
+        if role == "assistant":
+            self.compactor.maybe_compact()
+
+    def complete(self, messages) -> str:
+        """单次请求模型 (不使用也不写入对话上下文), 用于对话摘要等后台任务
+
+        Args:
+            messages (list): 请求消息列表
+
+        Returns:
+            str: 回复内容
+        """
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            stream=False,
+        )
+        return self.remove_think_tags(response.choices[0].message.content or "")
+
+    def build_messages(self):
+        """按上下文token预算组装本次请求的消息列表 (预算外的旧轮次从内存中移除)
+
+        Returns:
+            list: 本次请求的消息列表
+        """
+        request, self.messages = self.context.build(self.messages)
+        return request
 
     def remove_think_tags(self, text):
         # 匹配 <think> 标签及其前后可能的空格/换行，并清除内容
@@ -117,15 +162,16 @@ class openaiTypeModel:
             # 调用API
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=self.messages,
+                messages=self.build_messages(),
                 temperature=self.temperature,
                 stream=False,
             )
-            # 获取助手回复
-            assistant_response = response.choices[0].message.content
+            # 获取助手回复 (官方接口不在正文中输出思考部分, 第三方接口可能输出, 统一清洗)
+            assistant_response = self.remove_think_tags(
+                response.choices[0].message.content or ""
+            )
             # 将完整回复添加到上下文
             self.add_message("assistant", self.bot_name, assistant_response)
-            # 这里官方支持可以不输出思考部分, 所以不需要清洗了
             return assistant_response
         except KeyError as e:
             return f"发生错误: {str(e)}"
@@ -147,16 +193,31 @@ class openaiTypeModel:
         try:
             stream = self.client.chat.completions.create(
                 model=self.model,
-                messages=self.messages,
+                messages=self.build_messages(),
                 temperature=self.temperature,
                 stream=True,  # 启用流式模式
             )
-            # 处理流式响应
+            # 处理流式响应, 推理内容不显示/朗读, 也不写入上下文与历史记录
+            think_filter = ThinkTagFilter()
             for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    chunk_content = chunk.choices[0].delta.content
-                    yield chunk_content
-                    full_response += chunk_content
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                # 部分推理模型通过独立字段返回推理内容, 只做统计
+                reasoning_content = getattr(delta, "reasoning_content", None)
+                if reasoning_content:
+                    think_filter.add_reasoning(reasoning_content)
+                if delta.content:
+                    chunk_content = think_filter.feed(delta.content)
+                    if chunk_content:
+                        yield chunk_content
+                        full_response += chunk_content
+            chunk_content = think_filter.close()
+            if chunk_content:
+                yield chunk_content
+                full_response += chunk_content
+            if self.think_metrics:
+                think_filter.report()
             # 将完整回复添加到上下文
             self.add_message("assistant", self.bot_name, full_response)
         except Exception as e:
@@ -7,12 +7,52 @@ import logging
 logger = logging.getLogger("replyParser_module")
 
 
-def replyParser(reply: str, delimiter: str = "|||"):
+# 回复格式: 各部分的类型顺序 (repeat为True时, 表情之后的部分循环出现), 以及写入系统提示词的格式要求
+# 日语在前的格式可以让语音合成在中文生成之前开始; 逐句交替的格式可以边生成后续句子边朗读前面的句子
+REPLY_SCHEMAS = {
+    "ep_zh_jp": {
+        "fields": ("ep", "zh", "jp"),
+        "repeat": False,
+        "format": "{表情}|||{中文}|||{日语}",
+        "prompt": '你的回答仅能包含以下内容："表情或动作 ||| 中文回复 ||| 日文翻译", 除此之外不应该输出任何多余内容.',
+    },
+    "ep_jp_zh": {
+        "fields": ("ep", "jp", "zh"),
+        "repeat": False,
+        "format": "{表情}|||{日语}|||{中文}",
+        "prompt": '你的回答仅能包含以下内容："表情或动作 ||| 日文翻译 ||| 中文回复", 请先输出日文再输出中文, 除此之外不应该输出任何多余内容.',
+    },
+    "interleaved": {
+        "fields": ("ep", "jp", "zh"),
+        "repeat": True,
+        "format": "{表情}|||{日语1}|||{中文1}|||{日语2}|||{中文2}...",
+        "prompt": '你的回答仅能包含以下内容："表情或动作 ||| 第1句日文 ||| 第1句中文 ||| 第2句日文 ||| 第2句中文 ...", 日文与中文逐句交替输出, 每句日文之后紧跟对应的中文, 除此之外不应该输出任何多余内容.',
+    },
+}
+
+
+def get_reply_schema(schema: str) -> dict:
+    """获取回复格式定义, 未知格式时使用默认格式
+
+    Args:
+        schema (str): 回复格式名称
+
+    Returns:
+        dict: 回复格式定义
+    """
+    if schema not in REPLY_SCHEMAS:
+        logger.warning(f"未知的回复格式: {schema}, 使用默认格式ep_zh_jp")
+        schema = "ep_zh_jp"
+    return REPLY_SCHEMAS[schema]
+
+
+def replyParser(reply: str, delimiter: str = "|||", schema: str = "ep_zh_jp"):
     """解析 {表情}|||{中文}|||{日语} 格式的字符串，确保对分隔符冲突的处理安全。
 
     Args:
         reply (str): 模型回复文本
         delimiter (str, optional): 文本分割符. Defaults to "|||".
+        schema (str, optional): 回复格式, 见REPLY_SCHEMAS. Defaults to "ep_zh_jp".
 
     Returns:
         json: 解析后数据
@@ -37,38 +77,179 @@ def replyParser(reply: str, delimiter: str = "|||"):
     # 4. 替换掉可能冲突的分隔符（如多余的空格）
     reply = re.sub(r"\s+", " ", reply)
 
-    # 5. 转义分隔符
-    escaped_delimiter = re.escape(delimiter)
+    # 5. 与流式生成使用同一个解析器, 一次传入完整回复
+    parser = StreamingReplyParser(delimiter, schema)
+    parser.feed(reply)
+    parser.close()
+    return parser.result()
+
+
+class StreamingReplyParser:
+    """{表情}|||{中文}|||{日语} 等格式回复的增量解析器 (推送式, 用于流式生成)
+
+    每次feed传入一块流式文本, 返回本次新产生的事件列表, 事件为(类型, 内容):
+        ("ep", 表情)  表情部分已结束
+        ("zh", 文本)  中文部分新增的文本
+        ("jp", 句子)  日语部分已生成完整的句子 (日语部分结束时剩余文本也作为一句)
+    格式异常时尽量降级: 始终没有分隔符时在close时整段按中文部分处理 (不朗读);
+    多余的分隔符之后的内容以空格隔开保留. 发生降级时result返回非0状态.
+    """
+
+    # 日语句末标点 (连同紧随其后的右括号/引号)
+    SENTENCE_END = re.compile(r"[。！？!?\n]+[」』）)]*")
+
+    def __init__(self, delimiter: str = "|||", schema: str = "ep_zh_jp"):
+        """解析器初始化
 
-    # 6. 正则匹配的模式，确保两边有空格、换行符都被正确忽略
-    pattern = rf"^(.*?)\s*{escaped_delimiter}\s*(.*?)\s*{escaped_delimiter}\s*(.*?)$"
+        Args:
+            delimiter (str, optional): 文本分割符. Defaults to "|||".
+            schema (str, optional): 回复格式, 见REPLY_SCHEMAS. Defaults to "ep_zh_jp".
+        """
+        self.delimiter = delimiter
+        self.schema = get_reply_schema(schema)
+        self.fields = self.schema["fields"]
+        self.field = 0  # 当前所在部分在fields中的位置
+        self.data = {"ep": "", "zh": "", "jp": ""}  # 各类型已解析的文本
+        self._field_started = False  # 当前部分是否已有非空白内容
+        self._last_field = 0  # 到达过的最后一个部分 (用于判断格式是否完整)
+        self._fallback = None  # 格式异常时的降级说明 (非None时解析结果不可信)
+        self._buffer = ""  # 可能属于分隔符开头的暂缓文本
+        self._jp_pending = ""  # 日语部分尚未组成完整句子的文本
 
-    # 7. 使用 try-except 捕获正则匹配错误
-    try:
-        match = re.match(pattern, reply)
-    except Exception as e:
-        return {"status": 500, "message": f"正则表达式匹配失败，错误: {e}"}
+    def feed(self, chunk: str) -> list:
+        """传入一块流式文本
 
-    # 8. 检查匹配结果
-    if not match:
-        return {
-            "status": 400,
-            "message": "解析内容格式不正确，应为 {表情}|||{中文}|||{日语}",
-        }
+        Args:
+            chunk (str): 新生成的文本
 
-    # 9. 提取结果
-    expression, chinese, japanese = match.groups()
+        Returns:
+            list: 新产生的事件
+        """
+        events = []
+        text = self._buffer + chunk
+        while True:
+            index = text.find(self.delimiter)
+            if index < 0:
+                break
+            self._append(text[:index], events)
+            self._end_field(events)
+            text = text[index + len(self.delimiter) :]
+        # 末尾可能是被拆开的分隔符, 暂缓到下一块再判断
+        keep = 0
+        for n in range(min(len(self.delimiter) - 1, len(text)), 0, -1):
+            if text.endswith(self.delimiter[:n]):
+                keep = n
+                break
+        self._buffer = text[len(text) - keep :] if keep else ""
+        self._append(text[: len(text) - keep], events)
+        return events
 
-    # 10. 清理多余空格
-    return {
-        "status": 0,
-        "message": "解析成功",
-        "data": {
-            "ep": expression.strip(),
-            "zh": chinese.strip(),
-            "jp": japanese.strip(),
-        },
-    }
+    def close(self) -> list:
+        """流式生成结束, 输出剩余内容
+
+        Returns:
+            list: 新产生的事件
+        """
+        events = []
+        self._append(self._buffer, events)
+        self._buffer = ""
+        if self.field == 0 and self.data["ep"].strip():
+            # 只有整段回复都没有分隔符时才重新归类, 见到分隔符之后不再改动已解析的部分
+            logger.warning("回复中没有分隔符, 按中文回复处理")
+            self._fallback = "回复中没有分隔符"
+            text = self.data["ep"]
+            self.data["ep"] = ""
+            # 按名称查找中文部分, 日语在前的格式中中文不在第二部分
+            self._next_field(self.fields.index("zh"))
+            self._append(text, events)
+        if self.fields[self.field] == "jp":
+            self._pop_sentences(events, final=True)
+        return events
+
+    def result(self) -> dict:
+        """获取完整的解析结果 (格式与replyParser一致)
+
+        Returns:
+            dict: 解析后数据
+        """
+        data = {key: value.strip() for key, value in self.data.items()}
+        if not any(data.values()):
+            return {"status": 400, "message": "解析内容为空", "data": data}
+        if self._fallback is not None or self._last_field < len(self.fields) - 1:
+            reason = f" ({self._fallback})" if self._fallback else ""
+            return {
+                "status": 400,
+                "message": f"解析内容格式不正确{reason}，应为 {self.schema['format']}",
+                "data": data,
+            }
+        return {"status": 0, "message": "解析成功", "data": data}
+
+    def _append(self, text, events):
+        """将文本追加到当前部分"""
+        if not self._field_started:
+            text = text.lstrip()
+        if not text:
+            return
+        self._field_started = True
+        kind = self.fields[self.field]
+        self.data[kind] += text
+        if kind == "zh":
+            events.append(("zh", text))
+        elif kind == "jp":
+            self._jp_pending += text
+            self._pop_sentences(events)
+
+    def _end_field(self, events):
+        """遇到分隔符, 结束当前部分"""
+        kind = self.fields[self.field]
+        if kind == "ep":
+            expression = self.data["ep"].strip()
+            if expression:
+                events.append(("ep", expression))
+        elif kind == "zh":  # 逐句交替时各句中文直接相连
+            self.data["zh"] = self.data["zh"].rstrip()
+        elif kind == "jp":  # 日语部分结束时剩余文本也作为一句朗读
+            self._pop_sentences(events, final=True)
+        if self.field + 1 < len(self.fields):
+            self._next_field(self.field + 1)
+        elif self.schema["repeat"]:  # 逐句交替的格式回到表情之后的第一部分
+            self._next_field(1)
+        else:
+            # 多余的分隔符: 之后的内容以空格隔开继续归入最后一部分 (分隔符本身不显示/朗读)
+            logger.warning("回复中有多余的分隔符")
+            self._fallback = "回复中有多余的分隔符"
+            last = self.fields[self.field]
+            if self.data[last].strip():
+                self.data[last] = self.data[last].rstrip() + " "
+            self._field_started = False
+
+    def _next_field(self, field):
+        self.field = field
+        self._field_started = False
+        self._last_field = max(self._last_field, field)
+
+    def _pop_sentences(self, events, final=False):
+        """从日语部分取出已完整的句子
+
+        Args:
+            final (bool, optional): 是否输出全部剩余文本. Defaults to False.
+        """
+        pending = self._jp_pending
+        # 句末标点之后至少还有一个字符时才确认句子结束 (避免拆开连续的标点)
+        ends = [
+            match.end()
+            for match in self.SENTENCE_END.finditer(pending)
+            if match.end() < len(pending)
+        ]
+        if final:
+            ends.append(len(pending))
+        start = 0
+        for end in ends:
+            sentence = pending[start:end].strip()
+            if sentence:
+                events.append(("jp", sentence))
+            start = end
+        self._jp_pending = pending[start:]
 
 
 if __name__ == "__main__":
@@ -76,21 +257,53 @@ if __name__ == "__main__":
 
     # 初始化日志配置
     logging_config.setup_logging()
-    # 测试用例
-    test_reply = ""
 
-    logger.debug(f"测试内容: {test_reply}")
+    def parse_streaming(reply, size=3, schema="ep_zh_jp"):
+        """按固定长度分块流式解析, 返回(事件列表, 解析结果)"""
+        parser = StreamingReplyParser(schema=schema)
+        events = []
+        for i in range(0, len(reply), size):
+            events += parser.feed(reply[i : i + size])
+        events += parser.close()
+        return events, parser.result()
 
+    # 测试用例: 表情/动作部分较长时字段不错位
+    test_reply = "轻轻地歪着头, 露出一个有点害羞但又很开心的微笑, 然后看着你|||你好。|||こんにちは。"
+    logger.debug(f"测试内容: {test_reply}")
     parsed_reply = replyParser(test_reply)
-    parse_status = parsed_reply.get("status")
-    parse_message = parsed_reply.get("message")
-
-    if not parse_status:
-        tachie_expression = parsed_reply.get("data").get("ep")
-        Chinese_message = parsed_reply.get("data").get("zh")
-        Japanese_message = parsed_reply.get("data").get("jp")
-        logger.debug(f"tachie_expression: {tachie_expression}")
-        logger.debug(f"Chinese_message: {Chinese_message}")
-        logger.debug(f"Japanese_message: {Japanese_message}")
-    else:
-        logger.debug(f"最终结果: {parse_message}")
+    assert parsed_reply["status"] == 0, parsed_reply
+    assert parsed_reply["data"] == {
+        "ep": "轻轻地歪着头, 露出一个有点害羞但又很开心的微笑, 然后看着你",
+        "zh": "你好。",
+        "jp": "こんにちは。",
+    }, parsed_reply
+    events, parsed_reply = parse_streaming(test_reply)
+    assert parsed_reply["status"] == 0, parsed_reply
+    assert [value for kind, value in events if kind == "jp"] == ["こんにちは。"], events
+
+    # 测试用例: 多余的分隔符不拼接内容, 并返回非0状态
+    parsed_reply = replyParser("a|||b|||c|||d")
+    assert parsed_reply["status"] != 0, parsed_reply
+    assert parsed_reply["data"]["jp"] == "c d", parsed_reply
+    events, parsed_reply = parse_streaming("a|||b|||c|||d", size=1)
+    assert parsed_reply["status"] != 0, parsed_reply
+    assert [value for kind, value in events if kind == "jp"] == ["c", "d"], events
+
+    # 测试用例: 各回复格式没有分隔符时均按中文内容显示 (不朗读), 并返回非0状态
+    for schema in REPLY_SCHEMAS:
+        parsed_reply = replyParser("只有中文的回复", schema=schema)
+        assert parsed_reply["status"] != 0, (schema, parsed_reply)
+        assert parsed_reply["data"]["zh"] == "只有中文的回复", (schema, parsed_reply)
+        assert not parsed_reply["data"]["jp"], (schema, parsed_reply)
+        events, parsed_reply = parse_streaming("只有中文的回复", schema=schema)
+        assert parsed_reply["status"] != 0, (schema, parsed_reply)
+        assert parsed_reply["data"]["zh"] == "只有中文的回复", (schema, parsed_reply)
+        assert not [kind for kind, _ in events if kind == "jp"], (schema, events)
+
+    # 测试用例: 分隔符被拆分在两块之间
+    events, parsed_reply = parse_streaming("微笑脸|||你好呀！|||元気？うん。", size=2)
+    assert parsed_reply["status"] == 0, parsed_reply
+    assert events[0] == ("ep", "微笑脸"), events
+    assert [value for kind, value in events if kind == "jp"] == ["元気？", "うん。"], events
+
+    logger.debug("replyParser测试通过")
@@ -18,7 +18,8 @@ if __name__ == "__main__":
     main_window.show()
 
     vits_speaker = vitsSpeaker(settings)
-    vits_speaker.audio_lipsync_signal.connect(main_window.set_mouth_open_y)
+    # 渲染时按播放时钟查询口型包络
+    main_window.set_lipsync_source(vits_speaker.lipsync)
 
     # 要合成的日语文本
     text = "チャロ！わが輩はレイだよ！何かお手伝いできること、あるかな～？"
@@ -0,0 +1,125 @@
+# speakerTracker_module.py (增量说话人跟踪)
+
+import numpy as np
+import logging
+from logging_config import gcww
+
+# 获取根记录器
+logger = logging.getLogger("speakerTracker_module")
+
+
+class SpeakerTracker:
+    """增量说话人跟踪
+
+    语音活跃期间按较粗的步长(hop)计算声纹特征, 并按说话人分段缓存.
+    新特征与当前分段的中心足够相似时沿用当前说话人, 只有检测到说话人切换点时
+    才重新与声纹库比对; 分段仍未匹配(Unknown)时, 每次更新中心后都重新比对.
+    当前说话人通过current_speaker暴露.
+    """
+
+    MAX_SEGMENTS = 32  # 最多缓存的分段数量
+
+    def __init__(self, vpr_manager, main_settings, sample_rate=16000):
+        """说话人跟踪初始化
+
+        Args:
+            vpr_manager (VoicePrintRecognition): 声纹管理器
+            main_settings (dict): 配置文件读取后得到的dict
+            sample_rate (int, optional): 音频采样率. Defaults to 16000.
+        """
+        self.vpr_manager = vpr_manager
+        self.hop_samples = int(
+            gcww(main_settings, "vpr_track_hop_time", 1.0, logger) * sample_rate
+        )
+        self.window_samples = int(
+            gcww(main_settings, "vpr_track_window_time", 1.0, logger) * sample_rate
+        )
+        self.change_threshold = gcww(
+            main_settings, "vpr_change_threshold", 0.7, logger
+        )
+        self.reset()
+
+    def reset(self):
+        """清空分段缓存 (一句话处理完毕或缓冲区重置时调用)"""
+        self.segments = []  # 每段: {"speaker", "centroid", "count", "start", "end"}
+        self.current_speaker = "Unknown"
+        self._last_embed_pos = None  # 上一次计算特征时的缓冲区位置
+
+    def on_silence(self):
+        """语音中断, 下一次语音开始时立即计算特征"""
+        self._last_embed_pos = None
+
+    def update(self, ring):
+        """语音活跃时调用, 按步长增量计算特征并更新当前说话人
+
+        Args:
+            ring (AudioRingBuffer): 录音环形缓冲区
+
+        Returns:
+            str: 当前说话人, 未匹配则为"Unknown"
+        """
+        pos = ring.total
+        if (
+            self._last_embed_pos is not None
+            and pos - self._last_embed_pos < self.hop_samples
+        ):
+            return self.current_speaker
+        self._last_embed_pos = pos
+
+        # 滑动窗口的音频之后不会再查询, 不写入特征缓存
+        embedding = self.vpr_manager.extract_embedding(
+            [ring.latest(self.window_samples)], use_cache=False
+        )
+        segment = self.segments[-1] if self.segments else None
+        if (
+            segment is not None
+            and self.vpr_manager.embedding_similarity(embedding, segment["centroid"])
+            >= self.change_threshold
+        ):
+            # 同一说话人, 更新分段中心
+            count = segment["count"]
+            segment["centroid"] = (segment["centroid"] * count + embedding) / (
+                count + 1
+            )
+            segment["count"] = count + 1
+            segment["end"] = pos
+            if segment["speaker"] == "Unknown":
+                # 首个特征可能覆盖较多语音开始前的音频, 中心随语音累积更可靠, 未匹配时继续比对
+                speaker = self.vpr_manager.match_embedding(segment["centroid"])
+                if speaker != "Unknown":
+                    logger.debug(f"分段中心更新后匹配到说话人: {speaker}")
+                    segment["speaker"] = speaker
+                    self.current_speaker = speaker
+        else:
+            if segment is not None:
+                logger.debug("检测到说话人切换点, 重新比对声纹")
+            self.current_speaker = self.vpr_manager.match_embedding(embedding)
+            self.segments.append(
+                {
+                    "speaker": self.current_speaker,
+                    "centroid": np.asarray(embedding, dtype=np.float32),
+                    "count": 1,
+                    "start": max(0, pos - self.window_samples),
+                    "end": pos,
+                }
+            )
+            del self.segments[: -self.MAX_SEGMENTS]
+        return self.current_speaker
+
+    def utterance_speaker(self, start):
+        """根据缓存的分段统计一句话的说话人 (按特征数量加权取最多者)
+
+        Args:
+            start (int): 这句话在缓冲区中的起点
+
+        Returns:
+            str | None: 说话人名称, 没有覆盖该区间的分段时返回None
+        """
+        votes = {}
+        for segment in self.segments:
+            if segment["end"] > start:
+                speaker = segment["speaker"]
+                votes[speaker] = votes.get(speaker, 0) + segment["count"]
+        if not votes:
+            return None
+        return max(votes, key=votes.get)
@@ -0,0 +1,105 @@
+# thinkFilter_module.py (推理模型<think>内容过滤)
+
+import time
+import logging
+
+# 获取根记录器
+logger = logging.getLogger("thinkFilter_module")
+
+
+class ThinkTagFilter:
+    """流式输出的<think>...</think>推理内容过滤器 (推送式)
+
+    feed传入模型流式输出的文本块, 返回去掉推理内容后可以显示/朗读的文本.
+    标签被拆分在两块之间时暂缓输出可能属于标签开头的末尾字符; 推理块之后的空白一并去除.
+    同时统计推理内容的字数与耗时.
+    """
+
+    OPEN_TAG = "<think>"
+    CLOSE_TAG = "</think>"
+
+    def __init__(self):
+        self.in_think = False  # 当前是否处于推理块内
+        self.reasoning_chars = 0  # 推理内容字数
+        self.reasoning_time = 0.0  # 推理耗时(秒)
+        self._think_start = None
+        self._buffer = ""  # 可能属于标签开头的暂缓文本
+        self._strip_leading = True  # 是否去除接下来输出的开头空白
+
+    def feed(self, chunk: str) -> str:
+        """传入一块流式文本
+
+        Args:
+            chunk (str): 模型新输出的文本
+
+        Returns:
+            str: 去掉推理内容后的文本 (可能为空)
+        """
+        output = []
+        text = self._buffer + chunk
+        while True:
+            tag = self.CLOSE_TAG if self.in_think else self.OPEN_TAG
+            index = text.find(tag)
+            if index < 0:
+                break
+            self._emit(text[:index], output)
+            text = text[index + len(tag) :]
+            self._toggle()
+        # 末尾可能是被拆开的标签, 暂缓到下一块再判断
+        keep = 0
+        for n in range(min(len(tag) - 1, len(text)), 0, -1):
+            if text.endswith(tag[:n]):
+                keep = n
+                break
+        self._buffer = text[len(text) - keep :] if keep else ""
+        self._emit(text[: len(text) - keep], output)
+        return "".join(output)
+
+    def close(self) -> str:
+        """流式输出结束, 返回剩余的可显示文本 (未闭合的推理块按推理内容丢弃)"""
+        output = []
+        self._emit(self._buffer, output)
+        self._buffer = ""
+        if self.in_think:
+            logger.warning("模型输出的<think>推理块没有闭合")
+            self._toggle()
+        return "".join(output)
+
+    def add_reasoning(self, text: str):
+        """统计通过独立字段返回的推理内容 (如reasoning_content)
+
+        Args:
+            text (str): 推理内容
+        """
+        if self._think_start is None:
+            self._think_start = time.perf_counter()
+        self.reasoning_chars += len(text)
+        self.reasoning_time = time.perf_counter() - self._think_start
+
+    def report(self):
+        """输出推理内容的统计信息"""
+        if self.reasoning_chars:
+            logger.info(
+                f"模型推理内容: {self.reasoning_chars}字, 耗时{self.reasoning_time:.2f}s"
+            )
+
+    def _emit(self, text, output):
+        if self.in_think:
+            self.reasoning_chars += len(text)
+            return
+        if self._strip_leading:
+            text = text.lstrip()
+            if not text:
+                return
+            self._strip_leading = False
+        output.append(text)
+
+    def _toggle(self):
+        """进入或离开推理块"""
+        now = time.perf_counter()
+        if self.in_think:
+            self.reasoning_time += now - self._think_start
+            self._strip_leading = True
+        else:
+            self._think_start = now
+        self.in_think = not self.in_think
@@ -0,0 +1,181 @@
+# ttsCache_module.py (语音合成音频缓存)
+
+import os, json, hashlib, threading
+from collections import OrderedDict
+import logging
+
+# 获取根记录器
+logger = logging.getLogger("ttsCache_module")
+
+
+class TTSAudioCache:
+    """以合成参数为键的TTS音频两级LRU缓存 (线程安全)
+
+    键由(清洗后的文本, speaker_id, lang, length, format)的哈希得到.
+    内存层按条目数限制, 磁盘层按总字节数限制, 命中磁盘时回填内存层.
+    """
+
+    def __init__(self, cache_dir, memory_size=64, disk_size_mb=200):
+        """缓存初始化
+
+        Args:
+            cache_dir (str): 磁盘缓存目录
+            memory_size (int, optional): 内存层最多缓存的音频数量. Defaults to 64.
+            disk_size_mb (float, optional): 磁盘层容量上限(MB), 0表示不使用磁盘层. Defaults to 200.
+        """
+        self.cache_dir = cache_dir
+        self.memory_size = memory_size
+        self.disk_size = int(disk_size_mb * 1024 * 1024)
+        self._memory = OrderedDict()  # 键 -> 音频数据
+        self._disk = OrderedDict()  # 键 -> (文件路径, 字节数), 按最近使用时间排序
+        self._disk_total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.disk_size > 0:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def _load_disk_index(self):
+        """扫描磁盘缓存目录, 按修改时间恢复LRU顺序"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".tmp"):  # 上次写入中断留下的临时文件
+                os.remove(path)
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, name.split(".")[0], path, stat.st_size))
+        for _, key, path, size in sorted(entries):
+            self._disk[key] = (path, size)
+            self._disk_total += size
+        logger.info(
+            f"TTS磁盘缓存: {len(self._disk)}条, {self._disk_total / 1024 / 1024:.1f}MB"
+        )
+
+    @staticmethod
+    def make_key(params):
+        """计算合成参数的缓存键
+
+        Args:
+            params (dict): TTS请求参数 (text/id/lang/length/format)
+
+        Returns:
+            str: 缓存键
+        """
+        raw = json.dumps(
+            [
+                params["text"],
+                str(params["id"]),
+                params["lang"],
+                float(params["length"]),
+                params["format"],
+            ],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _put_memory(self, key, audio_data):
+        self._memory[key] = audio_data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """读取缓存
+
+        Returns:
+            bytes | None: 音频数据, 未命中返回None
+        """
+        with self._lock:
+            audio_data = self._memory.get(key)
+            if audio_data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return audio_data
+            entry = self._disk.get(key)
+            if entry is not None:
+                try:
+                    with open(entry[0], "rb") as f:
+                        audio_data = f.read()
+                    os.utime(entry[0])  # 更新修改时间, 重启后保持LRU顺序
+                except OSError as e:
+                    logger.warning(f"TTS磁盘缓存读取失败: {e}")
+                    self._disk.pop(key)
+                    self._disk_total -= entry[1]
+                else:
+                    self._disk.move_to_end(key)
+                    self._put_memory(key, audio_data)
+                    self.hits += 1
+                    return audio_data
+            self.misses += 1
+            return None
+
+    def put(self, key, audio_data, format="wav"):
+        """写入缓存 (内存层与磁盘层)
+
+        Args:
+            key (str): 缓存键
+            audio_data (bytes): 音频数据
+            format (str, optional): 音频格式, 用作文件后缀. Defaults to "wav".
+        """
+        with self._lock:
+            self._put_memory(key, audio_data)
+            if self.disk_size <= 0 or len(audio_data) > self.disk_size:
+                return
+            if key in self._disk:
+                self._disk.move_to_end(key)
+                return
+            path = os.path.join(self.cache_dir, f"{key}.{format}")
+            try:
+                # 先写临时文件再替换, 避免中断后留下不完整的音频
+                with open(path + ".tmp", "wb") as f:
+                    f.write(audio_data)
+                os.replace(path + ".tmp", path)
+            except OSError as e:
+                logger.warning(f"TTS磁盘缓存写入失败: {e}")
+                return
+            self._disk[key] = (path, len(audio_data))
+            self._disk_total += len(audio_data)
+            # 超出容量时删除最久未使用的音频
+            while self._disk_total > self.disk_size:
+                _, (old_path, size) = self._disk.popitem(last=False)
+                self._disk_total -= size
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+
+
+# 预热缓存: python ttsCache_module.py phrases.txt (每行一句日语文本)
+if __name__ == "__main__":
+    import argparse, logging_config, yaml
+    from vits_module import vitsSpeaker
+
+    # 初始化日志配置
+    logging_config.setup_logging()
+
+    parser = argparse.ArgumentParser(description="根据短语列表预热TTS音频缓存")
+    parser.add_argument("phrase_file", help="短语列表文件, 每行一句")
+    parser.add_argument("--config", default="./config.yaml", help="配置文件路径")
+    parser.add_argument("--speaker-id", default=None, help="vits模型语音角色ID")
+    parser.add_argument("--lang", default="jp", help="输出语言")
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        settings = yaml.safe_load(f)
+    vits_speaker = vitsSpeaker(settings)
+    if vits_speaker.tts_cache is None:
+        raise SystemExit("配置中未开启TTS缓存 (vits_cache_switch)")
+
+    with open(args.phrase_file, "r", encoding="utf-8") as f:
+        phrases = [line.strip() for line in f if line.strip()]
+    # 与播放时相同的分句方式, 保证预热的键与实际请求一致
+    if vits_speaker.PIPELINE:
+        phrases = [s for phrase in phrases for s in vits_speaker.split_sentences(phrase)]
+
+    cached = 0
+    for phrase in phrases:
+        if vits_speaker.get_audio_stream(phrase, args.speaker_id, args.lang) is not None:
+            cached += 1
+    logger.info(f"TTS缓存预热完成: {cached}/{len(phrases)}句")
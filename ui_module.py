@@ -1,6 +1,6 @@
 # ui_module.py
 
-import sys
+import sys, os
 import copy
 from PyQt5.QtCore import Qt, QEvent, pyqtSignal, QTimer, QUrl
 from PyQt5.QtGui import QImage, QPixmap, QIcon, QDesktopServices
@@ -364,6 +364,25 @@ class UIDisplay(QMainWindow, MicButton):
         self.typing_timer.timeout.connect(self.on_typing_display)
         self.typing_timer.start(self.typing_speed)
 
+    def update_display_text(self, content):
+        """流式更新对话框文本 (模型回复生成中), 从已显示的位置继续逐字显示
+
+        Args:
+            content (str): 当前已生成的完整文本
+        """
+        new_content = markdown.markdown(content)
+        # 新旧HTML只在共同前缀内保持一致, 已显示的部分超出时回退到共同前缀
+        common = len(os.path.commonprefix([self.content, new_content]))
+        if self.current_char_index > common:
+            self.current_char_index = common
+            self.current_text = self.current_text[:common]
+            self.html_closed = self.current_text.count("<") - self.current_text.count(
+                ">"
+            )
+        self.content = new_content
+        if not self.typing_timer.isActive():
+            self.typing_timer.start(self.typing_speed)
+
     def auto_complete_html_end(self, html_text):
         """自动补全html格式, 用于动态渲染html内容
 
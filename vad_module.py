@@ -0,0 +1,86 @@
+# vad_module.py (流式人声检测)
+
+import numpy as np
+import torch
+from silero_vad import VADIterator
+import logging
+
+# 获取根记录器
+logger = logging.getLogger("vad_module")
+
+
+class StreamingVAD:
+    """有状态的流式VAD (基于silero_vad.VADIterator)
+
+    模型状态在音频块之间保持, 每个采样点只会被转换和打分一次,
+    并以采样点精度输出语音开始/结束事件.
+    """
+
+    WINDOW_SIZE = 512  # silero_vad在16kHz下要求的固定窗口大小
+
+    def __init__(
+        self,
+        vad_model,
+        sample_rate=16000,
+        threshold=0.3,
+        min_silence_duration_ms=600,
+        speech_pad_ms=30,
+    ):
+        """流式VAD初始化
+
+        Args:
+            vad_model: load_silero_vad()加载的模型
+            sample_rate (int, optional): 采样率, 必须为16000. Defaults to 16000.
+            threshold (float, optional): 语音概率阈值. Defaults to 0.3.
+            min_silence_duration_ms (int, optional): 判定语音结束所需的最短静音时长. Defaults to 600.
+            speech_pad_ms (int, optional): 语音段首尾的填充时长. Defaults to 30.
+        """
+        self.sample_rate = sample_rate
+        self.vad_iterator = VADIterator(
+            vad_model,
+            threshold=threshold,
+            sampling_rate=sample_rate,
+            min_silence_duration_ms=min_silence_duration_ms,
+            speech_pad_ms=speech_pad_ms,
+        )
+        # 不足一个窗口的剩余采样点, 留到下一个音频块拼接
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        """重置模型状态与采样计数 (每次启动识别时调用)"""
+        self.vad_iterator.reset_states()
+        self._remainder = np.zeros(0, dtype=np.float32)
+
+    @property
+    def triggered(self):
+        """当前是否处于语音段内"""
+        return self.vad_iterator.triggered
+
+    def process(self, frame):
+        """输入一个音频块, 按固定窗口逐个打分
+
+        Args:
+            frame (np.ndarray): 单通道16kHz音频块 (int16或float32)
+
+        Returns:
+            list: 事件列表, 元素为("start"|"end", 采样点位置), 位置从reset()开始计数
+        """
+        if frame.dtype == np.int16:
+            frame = frame.astype(np.float32) / 32768.0
+        if self._remainder.size:
+            frame = np.concatenate((self._remainder, frame))
+
+        events = []
+        num_windows = len(frame) // self.WINDOW_SIZE
+        for i in range(num_windows):
+            window = frame[i * self.WINDOW_SIZE : (i + 1) * self.WINDOW_SIZE]
+            result = self.vad_iterator(torch.from_numpy(window))
+            if result:
+                for event, sample in result.items():
+                    events.append((event, int(sample)))
+                    logger.debug(
+                        f"VAD事件: {event} at {sample / self.sample_rate:.3f}s"
+                    )
+        self._remainder = frame[num_windows * self.WINDOW_SIZE :].copy()
+        return events
@@ -0,0 +1,123 @@
+# vitsClient_module.py (VITS语音合成HTTP客户端)
+
+import time, threading
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+import logging
+from logging_config import gcww
+
+# 获取根记录器
+logger = logging.getLogger("vitsClient_module")
+
+
+class VitsClient:
+    """VITS服务的HTTP客户端
+
+    使用保持连接的会话池, 支持连接/读取超时与指数退避重试.
+    配置多个服务副本时按最少未完成请求数选择副本, 超时或出错的副本会被暂时冷却.
+    """
+
+    RETRY_STATUS = (500, 502, 503, 504)  # 可重试的HTTP状态码
+
+    def __init__(self, main_settings):
+        """客户端初始化
+
+        Args:
+            main_settings (dict): 配置文件读取后得到的dict
+        """
+        api_url = gcww(
+            main_settings, "vits_api_url", "http://127.0.0.1:23456/voice/vits", logger
+        )
+        # vits_api_url可以是单个地址或多个副本地址的列表
+        self.urls = [api_url] if isinstance(api_url, str) else list(api_url)
+        self.timeout = (
+            gcww(main_settings, "vits_connect_timeout", 3.0, logger),
+            gcww(main_settings, "vits_read_timeout", 30.0, logger),
+        )
+        self.max_retries = gcww(main_settings, "vits_max_retries", 2, logger)
+        self.retry_backoff = gcww(main_settings, "vits_retry_backoff", 0.5, logger)
+        self.cooldown_time = gcww(main_settings, "vits_replica_cooldown", 10.0, logger)
+
+        # 保持连接的会话池 (每个副本最多pool_size个空闲连接)
+        pool_size = gcww(main_settings, "vits_pool_size", 4, logger)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.urls), pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._outstanding = {url: 0 for url in self.urls}  # 各副本未完成的请求数
+        self._cooldown_until = {url: 0.0 for url in self.urls}  # 各副本冷却结束时间
+        self._next = 0  # 请求数相同时轮询选择
+
+    def _acquire(self, exclude=()):
+        """选择未完成请求数最少的可用副本, 并计入一个未完成请求"""
+        with self._lock:
+            now = time.time()
+            candidates = [url for url in self.urls if url not in exclude] or self.urls
+            healthy = [url for url in candidates if self._cooldown_until[url] <= now]
+            candidates = healthy or candidates  # 全部冷却中时仍然尝试
+            # 从轮询位置开始比较, 请求数相同时依次分配到不同副本
+            start = self._next % len(candidates)
+            candidates = candidates[start:] + candidates[:start]
+            url = min(candidates, key=self._outstanding.get)
+            self._next += 1
+            self._outstanding[url] += 1
+            return url
+
+    def _release(self, url, failed=False):
+        """请求结束, 出错的副本进入冷却"""
+        with self._lock:
+            self._outstanding[url] -= 1
+            if failed:
+                self._cooldown_until[url] = time.time() + self.cooldown_time
+            else:
+                self._cooldown_until[url] = 0.0
+
+    @contextmanager
+    def stream(self, params):
+        """发送流式GET请求, 在with块内读取响应体, 退出时释放连接
+
+        连接失败/超时/服务端错误时按指数退避重试, 并优先换用其他副本.
+
+        Args:
+            params (dict): 请求参数
+
+        Yields:
+            requests.Response | None: 请求成功时返回响应, 否则返回None
+        """
+        tried = set()
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            url = self._acquire(exclude=tried)
+            tried.add(url)
+            try:
+                response = self.session.get(
+                    url, params=params, stream=True, timeout=self.timeout
+                )
+            except requests.RequestException as e:
+                logger.error(f"请求发生错误 ({url}): {e}")
+                self._release(url, failed=True)
+                continue
+
+            if response.status_code == 200:
+                failed = False
+                try:
+                    yield response
+                except requests.RequestException:
+                    failed = True  # 读取响应体时超时或断开
+                    raise
+                finally:
+                    response.close()
+                    self._release(url, failed=failed)
+                return
+
+            logger.error(f"音频请求失败 ({url})，状态码: {response.status_code}")
+            response.close()
+            retryable = response.status_code in self.RETRY_STATUS
+            self._release(url, failed=retryable)
+            if not retryable:
+                break
+        yield None
@@ -1,10 +1,13 @@
 # vits_module.py
 
-import requests, re
+import os, requests, re, queue, itertools, random
 from io import BytesIO
+from collections import deque
 import pydub, time, pygame, threading
 from PyQt5.QtCore import pyqtSignal, QObject
-from lipsync_module import WavHandler
+from lipsync_module import LipSyncEnvelope
+from vitsClient_module import VitsClient
+from ttsCache_module import TTSAudioCache
 import logging
 from logging_config import gcww
 
@@ -12,26 +15,116 @@ from logging_config import gcww
 logger = logging.getLogger("vits_module")
 
 
+class TTSJob:
+    """语音任务: 待合成的文本或已生成的音频"""
+
+    def __init__(self, job_id, text=None, args=(), audio_data=None, filler=False):
+        self.job_id = job_id
+        self.text = text
+        self.args = args  # (speaker_id, lang, format, length)
+        self.audio_data = audio_data
+        self.filler = filler  # 是否为等待模型回复时播放的填充语音
+        self.gain = 1.0  # 开始播放时的输出增益 (插话降低音量后保持到任务结束)
+        self.handoff = False  # 填充语音被正式回复接替: 任务结束但输出继续, 由回复淡出
+        self.crossfade = False  # 开始输出时将仍在播放的填充语音淡出并与之混合
+        self.cancel_event = threading.Event()
+
+
 class vitsSpeaker(QObject):
     # 声明音频播放完成的信号
     audio_played = pyqtSignal()
     audio_start_play = pyqtSignal()
-    audio_lipsync_signal = pyqtSignal(float)
+    # 语音任务开始/结束信号 (任务编号; 结束信号附带是否完整播放)
+    tts_job_started = pyqtSignal(int)
+    tts_job_finished = pyqtSignal(int, bool)
 
     def __init__(self, main_settings):
         super().__init__()
-        # 更新配置文件中的 API_URL 和 SPEAKER_ID
-        self.API_URL = gcww(
-            main_settings, "vits_api_url", "http://127.0.0.1:23456/voice/vits", logger
-        )
+        # HTTP客户端 (会话池/超时重试/多副本负载均衡, 读取vits_api_url等配置)
+        self.client = VitsClient(main_settings)
+        # 更新配置文件中的 SPEAKER_ID
         self.SPEAKER_ID = gcww(main_settings, "vits_speaker_id", 4, logger)
         self.CLEAN_TEXT = gcww(main_settings, "vits_clean_text", True, logger)
+        # 分句流水线合成: 播放第N句的同时合成第N+1句
+        self.PIPELINE = gcww(main_settings, "vits_pipeline_switch", True, logger)
+        self.PIPELINE_MIN_CHARS = gcww(
+            main_settings, "vits_pipeline_min_chars", 8, logger
+        )
+        # 流式播放: 边下载边解析wav, 收到文件头后即开始播放
+        self.STREAM = gcww(main_settings, "vits_stream_switch", True, logger)
+        self.STREAM_BLOCK_TIME = gcww(
+            main_settings, "vits_stream_block_time", 0.2, logger
+        )
+        self.STREAM_CHUNK_SIZE = 4096  # HTTP响应读取块大小(字节)
+        # 填充语音: 正式回复的第一块音频写入输出流时淡出, 与回复交叉混合
+        self.FILLER_CROSSFADE_TIME = gcww(
+            main_settings, "vits_filler_crossfade_time", 0.3, logger
+        )
+        self.filler_audio = {}  # 已预合成的填充语音: 文本 -> 音频
+        # TTS音频缓存: 相同文本与参数的音频直接读取缓存, 不再请求服务
+        self.tts_cache = None
+        if gcww(main_settings, "vits_cache_switch", True, logger):
+            database_dir = gcww(main_settings, "database_dir", "./database", logger)
+            self.tts_cache = TTSAudioCache(
+                os.path.join(database_dir, "tts_cache"),
+                memory_size=gcww(main_settings, "vits_cache_memory_size", 64, logger),
+                disk_size_mb=gcww(main_settings, "vits_cache_disk_mb", 200, logger),
+            )
 
-        # 控制停止播放音频事件
+        # 音频输出: sounddevice常驻输出流 (不可用时使用pygame)
+        self.output_engine = self._init_output_engine(main_settings)
+
+        # 控制停止播放音频事件 (指向当前任务的取消事件)
         self.stop_event = threading.Event()
-        # 音频播放线程
-        self.audio_thread = None
-        self.wav_handler = WavHandler()  # 添加WavHandler实例
+        # 语音任务队列: 单独的任务线程按提交顺序合成并播放, 不阻塞Qt界面线程
+        self._jobs = queue.Queue()
+        self._job_ids = itertools.count(1)
+        self._job_lock = threading.Lock()
+        self._active_jobs = {}  # 排队中及正在执行的任务: 任务编号 -> TTSJob
+        self.current_job = None
+        # 回复轮次编号: 用户插话时递增, 调用方据此丢弃被打断的回复中之后生成的语音
+        self.reply_generation = 0
+        self.worker_thread = threading.Thread(target=self._tts_worker, daemon=True)
+        self.worker_thread.start()
+        # 口型响度包络 (由渲染线程按播放时钟查询, 见Live2DWidget.set_lipsync_source)
+        self.lipsync = LipSyncEnvelope()
+
+    def _init_output_engine(self, main_settings):
+        """初始化常驻音频输出流
+
+        Returns:
+            AudioOutputEngine | None: 输出引擎, 配置为pygame或输出设备不可用时返回None
+        """
+        backend = gcww(main_settings, "vits_output_backend", "sounddevice", logger)
+        if backend != "sounddevice":
+            return None
+        try:
+            from audioOutput_module import AudioOutputEngine
+
+            engine = AudioOutputEngine(
+                device=gcww(main_settings, "vits_output_device", None, logger),
+                latency=gcww(main_settings, "vits_output_latency", "low", logger),
+            )
+            engine.check()
+        except Exception as e:
+            logger.warning(f"sounddevice音频输出不可用, 改用pygame播放: {e}")
+            return None
+        return engine
+
+    def _build_params(self, text, speaker_id=None, lang="jp", format="wav", length=1.0):
+        """构造TTS请求参数 (包含文本清洗)"""
+        if self.CLEAN_TEXT:  # 文本清洗，移除不适合朗读的内容
+            text = self.clean_text_for_vits(text)
+            logger.debug(f"文本清洗结果: {text}")
+
+        speaker_id = speaker_id or self.SPEAKER_ID  # 默认使用 SPEAKER_ID
+        return {
+            "text": text,
+            "id": speaker_id,
+            "lang": lang,
+            "format": format,
+            "length": length,
+        }
 
     def get_audio_stream(
         self, text, speaker_id=None, lang="jp", format="wav", length=1.0
@@ -48,32 +141,115 @@ class vitsSpeaker(QObject):
         Returns:
             bytes: 音频序列
         """
-        if self.CLEAN_TEXT:  # 文本清洗，移除不适合朗读的内容
-            text = self.clean_text_for_vits(text)
-            logger.debug(f"文本清洗结果: {text}")
+        params = self._build_params(text, speaker_id, lang, format, length)
+        if self.tts_cache is not None:
+            key = TTSAudioCache.make_key(params)
+            audio_data = self.tts_cache.get(key)
+            if audio_data is not None:
+                logger.debug("TTS缓存命中")
+                return audio_data
+        try:
+            with self.client.stream(params) as response:
+                audio_data = response.content if response is not None else None
+        except requests.RequestException as e:
+            logger.error(f"请求发生错误: {e}")
+            return None
+        if audio_data is not None and self.tts_cache is not None:
+            self.tts_cache.put(key, audio_data, format)
+        return audio_data
 
-        speaker_id = speaker_id or self.SPEAKER_ID  # 默认使用 SPEAKER_ID
-        params = {
-            "text": text,
-            "id": speaker_id,
-            "lang": lang,
-            "format": format,
-            "length": length,
-        }
+    def iter_audio_chunks(self, text, speaker_id=None, lang="jp", length=1.0):
+        """发送TTS请求, 边下载边返回wav音频的原始字节块
 
+        Yields:
+            bytes: 音频字节块 (未开启流式播放时为完整音频)
+        """
+        if not self.STREAM:
+            audio_data = self.get_audio_stream(text, speaker_id, lang, "wav", length)
+            if audio_data is not None:
+                yield audio_data
+            return
+        params = self._build_params(text, speaker_id, lang, "wav", length)
+        key = None
+        if self.tts_cache is not None:
+            key = TTSAudioCache.make_key(params)
+            audio_data = self.tts_cache.get(key)
+            if audio_data is not None:  # 缓存命中, 整段音频立即返回
+                logger.debug("TTS缓存命中")
+                yield audio_data
+                return
+        chunks = []
         try:
-            response = requests.get(self.API_URL, params=params, stream=True)
+            with self.client.stream(params) as response:
+                if response is None:
+                    return
+                for chunk in response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE):
+                    if chunk:
+                        chunks.append(chunk)
+                        yield chunk
+        except requests.RequestException as e:
+            logger.error(f"音频下载中断: {e}")
+            return
+        # 只缓存完整下载的音频
+        if key is not None and chunks:
+            self.tts_cache.put(key, b"".join(chunks))
 
-            # 判断请求是否成功
-            if response.status_code == 200:
-                return response.content
-            else:
-                logger.error(f"音频请求失败，状态码: {response.status_code}")
-                return None
+    @staticmethod
+    def _parse_wav_header(header):
+        """解析wav文件头
 
-        except requests.RequestException as e:
-            logger.error(f"请求发生错误: {e}")
+        Args:
+            header (bytes): 已接收的音频开头部分
+
+        Returns:
+            tuple | None: ((采样率, 声道数, 采样字节数), PCM数据起始位置), 文件头尚未接收完整时返回None
+        """
+        if len(header) < 12:
             return None
+        if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise ValueError("TTS返回的不是wav音频")
+        pos = 12
+        params = None
+        while len(header) >= pos + 8:
+            chunk_id = header[pos : pos + 4]
+            size = int.from_bytes(header[pos + 4 : pos + 8], "little")
+            if chunk_id == b"data":
+                if params is None:
+                    raise ValueError("wav音频缺少fmt块")
+                return params, pos + 8
+            if len(header) < pos + 8 + size:
+                return None
+            if chunk_id == b"fmt ":
+                channels = int.from_bytes(header[pos + 10 : pos + 12], "little")
+                sample_rate = int.from_bytes(header[pos + 12 : pos + 16], "little")
+                bits = int.from_bytes(header[pos + 22 : pos + 24], "little")
+                params = (sample_rate, channels, bits // 8)
+            pos += 8 + size + (size & 1)  # 块按偶数字节对齐
+        return None
+
+    def iter_audio_pcm(self, text, speaker_id=None, lang="jp", format="wav", length=1.0):
+        """合成音频并边下载边解析, 文件头到达后即开始返回PCM数据
+
+        Yields:
+            tuple: ((采样率, 声道数, 采样字节数), 按帧对齐的PCM字节)
+        """
+        header = b""
+        params = None
+        remainder = b""
+        for chunk in self.iter_audio_chunks(text, speaker_id, lang, length):
+            if params is None:
+                header += chunk
+                parsed = self._parse_wav_header(header)
+                if parsed is None:
+                    continue
+                params, offset = parsed
+                chunk = header[offset:]
+                frame_size = params[1] * params[2]
+            data = remainder + chunk
+            usable = len(data) - len(data) % frame_size
+            remainder = data[usable:]
+            if usable:
+                yield params, data[:usable]
 
     def play_audio(self, audio_data):
         """播放音频
@@ -81,6 +257,21 @@ class vitsSpeaker(QObject):
         Args:
             audio_data (bytes): 音频序列
         """
+        if self.output_engine is not None:
+            # 只解析一次wav文件头, PCM数据直接写入常驻输出流
+            try:
+                parsed = self._parse_wav_header(audio_data)
+            except ValueError:
+                parsed = None
+            if parsed is not None:
+                params, offset = parsed
+                frame_size = params[1] * params[2]
+                pcm = audio_data[offset:]
+                audio_queue = queue.Queue()
+                audio_queue.put((params, pcm[: len(pcm) - len(pcm) % frame_size]))
+                audio_queue.put(None)
+                self._play_queue_engine(audio_queue)
+                return
         try:
             audio = pydub.AudioSegment.from_wav(BytesIO(audio_data))
             pygame.mixer.init(frequency=audio.frame_rate)  # 初始化pygame的音频播放
@@ -90,88 +281,481 @@ class vitsSpeaker(QObject):
             # 开始播放音频发出型号
             self.audio_start_play.emit()
 
-            self.wav_handler.Start(audio_data)  # 开始处理音频数据
+            # 计算口型包络, 按pygame的播放位置查询
+            self.lipsync.load(
+                audio_data, clock=lambda: pygame.mixer.music.get_pos() / 1000
+            )
 
             while pygame.mixer.music.get_busy():
                 if self.stop_event.is_set():
+                    pygame.mixer.music.stop()
                     logger.info("音频播放已被打断")
                     break
-                if not self.wav_handler.Update():
-                    break  # 音频播放结束
-                else:
-                    self.audio_lipsync_signal.emit(self.wav_handler.GetRms())
                 time.sleep(0.1)
 
             logger.debug("音频播放完成")
             # 播放完成后发出信号
             self.audio_played.emit()
-            # 播放完成后口型归零
-            self.audio_lipsync_signal.emit(0.0)
 
         except Exception as e:
             logger.error(f"播放音频发生错误: {e}")
+        finally:
+            self.lipsync.stop()  # 播放完成后口型归零
 
-    def vits_play(self, text, speaker_id=None, lang="jp", format="wav", length=1.0):
-        """输入文本，生成并播放音频"""
-        try:
-            audio_data = self.get_audio_stream(text, speaker_id, lang, format, length)
+    def split_sentences(self, text):
+        """按日语句末标点分句, 过短的句子与相邻句合并 (避免语调割裂)
 
-            if audio_data is None:
-                logger.error("生成音频失败，无法播放。")
-                return
+        Args:
+            text (str): 待分句文本
 
-            logger.info("音频生成成功，正在播放...")
+        Returns:
+            list: 句子列表
+        """
+        # 在连续句末标点之后切分, 不拆开紧随其后的右括号/引号
+        pieces = re.split(r"(?<=[。！？!?\n])(?![。！？!?\n」』）)])", text)
+        sentences = []
+        for piece in pieces:
+            piece = piece.strip()
+            if not piece:
+                continue
+            if sentences and len(sentences[-1]) < self.PIPELINE_MIN_CHARS:
+                sentences[-1] += piece
+            else:
+                sentences.append(piece)
+        if len(sentences) > 1 and len(sentences[-1]) < self.PIPELINE_MIN_CHARS:
+            last = sentences.pop()
+            sentences[-1] += last
+        return sentences
 
-            # 如果已有播放线程，先停止之前的播放
-            if self.audio_thread and self.audio_thread.is_alive():
-                logger.info("正在停止之前的音频播放...")
-                self.vits_stop_audio()
+    def _synthesize_sentences(self, sentences, audio_queue, done_event, *args):
+        """依次合成每个句子, 将边下载边解析得到的PCM数据放入队列, 结束时放入None
 
-            # 创建一个新的线程来播放音频，这样主程序就不会被阻塞
-            self.stop_event.clear()  # 清除停止事件，准备播放新音频
-            self.audio_thread = threading.Thread(
-                target=self.play_audio, args=(audio_data,)
-            )
-            self.audio_thread.start()
+        Args:
+            sentences (list): 句子列表
+            audio_queue (queue.Queue): 合成结果队列, 元素为(音频参数, PCM字节)
+            done_event (threading.Event): 播放结束 (或被打断) 事件, 设置后停止合成
+        """
+        for i, sentence in enumerate(sentences):
+            if done_event.is_set():
+                break
+            received = False
+            try:
+                for item in self.iter_audio_pcm(sentence, *args):
+                    if done_event.is_set():
+                        break
+                    audio_queue.put(item)
+                    received = True
+            except ValueError as e:
+                logger.error(f"音频解析失败: {e}")
+            if not received:
+                logger.error(f"第{i + 1}句音频生成失败, 跳过: {sentence}")
+        audio_queue.put(None)
+
+    def _init_mixer(self, params):
+        """按音频参数初始化pygame混音器 (16位PCM)
+
+        Returns:
+            tuple: 混音器实际使用的(采样率, 声道数, 采样字节数)
+        """
+        sample_rate, channels, _ = params
+        if pygame.mixer.get_init() != (sample_rate, -16, channels):
+            if pygame.mixer.get_init():
+                pygame.mixer.quit()
+            pygame.mixer.init(frequency=sample_rate, size=-16, channels=channels)
+        # 音频设备可能不支持请求的格式, 以实际格式为准
+        frequency, size, channels = pygame.mixer.get_init()
+        return frequency, channels, abs(size) // 8
+
+    @staticmethod
+    def _convert_pcm(pcm, params, target_params):
+        """将PCM数据转换为混音器格式"""
+        audio = pydub.AudioSegment(
+            data=pcm, sample_width=params[2], frame_rate=params[0], channels=params[1]
+        )
+        audio = audio.set_frame_rate(target_params[0]).set_channels(target_params[1])
+        return audio.set_sample_width(target_params[2]).raw_data
 
-            logger.debug("主程序继续执行，音频正在播放...")
+    def play_audio_pipelined(self, sentences, *args):
+        """流式播放: 后台逐句合成并边下载边解析, PCM数据到达后即开始播放
+
+        Args:
+            sentences (list): 句子列表
+            *args: 透传给iter_audio_pcm的合成参数
+        """
+        audio_queue = queue.Queue()
+        done_event = threading.Event()
+        threading.Thread(
+            target=self._synthesize_sentences,
+            args=(sentences, audio_queue, done_event, *args),
+            daemon=True,
+        ).start()
+        try:
+            if self.output_engine is not None:
+                self._play_queue_engine(audio_queue)
+            else:
+                self._play_queue_pygame(audio_queue)
+        finally:
+            done_event.set()  # 停止后台合成
+
+    def _play_queue_engine(self, audio_queue):
+        """通过常驻输出流播放队列中的PCM数据
+
+        PCM数据到达后直接写入输出流并追加到口型包络, 口型按输出流的播放位置查询;
+        播放结束由输出流的finished事件通知, 无需轮询声道状态.
+
+        Args:
+            audio_queue (queue.Queue): PCM数据队列, 元素为(音频参数, PCM字节), 以None结束
+        """
+        engine = self.output_engine
+        job = self.current_job
+        engine_params = None
+        finished = False  # 所有数据是否已写入
+        try:
+            while True:
+                if self.stop_event.is_set():
+                    if job is not None and job.handoff:
+                        # 已写入的填充语音继续输出, 由接替的回复开始播放时淡出
+                        logger.debug("填充语音交由正式回复淡出")
+                    else:
+                        engine.stop()
+                        logger.info("音频播放已被打断")
+                    break
+                if finished:
+                    if engine.wait(0.1):  # 播放结束时立即返回
+                        break
+                    continue
+
+                try:
+                    item = audio_queue.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                if item is None:
+                    finished = True
+                    if engine_params is None:
+                        logger.error("生成音频失败，无法播放。")
+                        break
+                    engine.end()
+                    continue
+                params, pcm = item
+                if engine_params is None:
+                    engine.open(params[0], params[1])
+                    engine_params = (engine.sample_rate, engine.channels, 2)
+                    with self._job_lock:  # 与插话降低音量互斥, 避免开始播放时恢复原音量
+                        if job is not None and job.crossfade:
+                            # 回复音频已到达, 仍在输出的填充语音从此刻开始淡出并与回复混合
+                            engine.stop(self.FILLER_CROSSFADE_TIME)
+                        engine.begin(job.gain if job is not None else 1.0)
+                    self.lipsync.start(
+                        engine.sample_rate,
+                        engine.channels,
+                        clock=lambda: engine.position / engine.sample_rate,
+                    )
+                    # 开始播放音频发出信号
+                    self.audio_start_play.emit()
+                if params != engine_params:
+                    pcm = self._convert_pcm(pcm, params, engine_params)
+                engine.write(pcm)
+                self.lipsync.append(pcm)
+
+            logger.debug("音频播放完成")
+            if engine_params is not None:
+                # 播放完成后发出信号
+                self.audio_played.emit()
 
         except Exception as e:
-            logger.error(f"发生错误: {e}")
+            engine.stop()
+            logger.error(f"播放音频发生错误: {e}")
+        finally:
+            self.lipsync.stop()  # 播放完成后口型归零
+
+    def _play_queue_pygame(self, audio_queue):
+        """通过pygame播放队列中的PCM数据, 数据按块排入同一声道无缝播放
 
-    def vits_play_audio_data(self, audio_data):
-        """输入文本，生成并播放音频"""
+        Args:
+            audio_queue (queue.Queue): PCM数据队列, 元素为(音频参数, PCM字节), 以None结束
+        """
+        channel = None
+        mixer_params = None
+        pcm_buffer = bytearray()  # 尚未组成播放块的PCM数据
+        blocks = deque()  # 待排入声道的播放块
+        finished = False  # 所有句子是否已下载完毕
         try:
-            if audio_data is None:
-                logger.error("生成音频失败，无法播放。")
-                return
+            while True:
+                if self.stop_event.is_set():
+                    pygame.mixer.stop()
+                    logger.info("音频播放已被打断")
+                    break
 
-            logger.info("音频生成成功，正在播放...")
+                # 取出已下载的PCM数据
+                while not finished:
+                    try:
+                        item = audio_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        finished = True
+                        break
+                    params, pcm = item
+                    if mixer_params is None:
+                        mixer_params = self._init_mixer(params)
+                    if params != mixer_params:
+                        pcm = self._convert_pcm(pcm, params, mixer_params)
+                    pcm_buffer += pcm
+
+                # 组成播放块; 下载完毕或播放中途声道空闲时不再等待凑满一块
+                if pcm_buffer:
+                    sample_rate, channels, width = mixer_params
+                    block_bytes = max(1, int(self.STREAM_BLOCK_TIME * sample_rate))
+                    block_bytes *= channels * width
+                    idle = channel is not None and not channel.get_busy()
+                    while pcm_buffer and (
+                        len(pcm_buffer) >= block_bytes or finished or (idle and not blocks)
+                    ):
+                        blocks.append(bytes(pcm_buffer[:block_bytes]))
+                        del pcm_buffer[:block_bytes]
+
+                # 排入声道 (pygame每个声道只能预排一个音频)
+                if blocks:
+                    if channel is None or not channel.get_busy():
+                        pcm = blocks.popleft()
+                        sound = pygame.mixer.Sound(buffer=pcm)
+                        if channel is None:
+                            channel = sound.play()
+                            # 开始播放音频发出信号
+                            self.audio_start_play.emit()
+                            self.lipsync.start(mixer_params[0], mixer_params[1])
+                        else:
+                            # 下载慢于播放导致声道空闲, 口型时钟对齐到当前位置
+                            channel.play(sound)
+                            self.lipsync.resync(self.lipsync.duration)
+                        self.lipsync.append(pcm)
+                    elif channel.get_queue() is None:
+                        pcm = blocks.popleft()
+                        channel.queue(pygame.mixer.Sound(buffer=pcm))
+                        self.lipsync.append(pcm)
+
+                if channel is None:
+                    if finished:
+                        logger.error("生成音频失败，无法播放。")
+                        break
+                elif (
+                    finished and not blocks and not pcm_buffer and not channel.get_busy()
+                ):
+                    break
+                time.sleep(0.05)
 
-            # 如果已有播放线程，先停止之前的播放
-            if self.audio_thread and self.audio_thread.is_alive():
-                logger.info("正在停止之前的音频播放...")
-                self.vits_stop_audio()
+            logger.debug("音频播放完成")
+            if channel is not None:
+                # 播放完成后发出信号
+                self.audio_played.emit()
 
-            # 创建一个新的线程来播放音频，这样主程序就不会被阻塞
-            self.stop_event.clear()  # 清除停止事件，准备播放新音频
-            self.audio_thread = threading.Thread(
-                target=self.play_audio, args=(audio_data,)
+        except Exception as e:
+            logger.error(f"播放音频发生错误: {e}")
+        finally:
+            self.lipsync.stop()  # 播放完成后口型归零
+
+    def _tts_worker(self):
+        """语音任务线程: 按提交顺序依次执行合成与播放, 不占用Qt界面线程"""
+        while True:
+            job = self._jobs.get()
+            with self._job_lock:
+                self.current_job = job
+            completed = False
+            if not job.cancel_event.is_set():
+                self.stop_event = job.cancel_event  # 播放循环通过stop_event响应取消
+                self.tts_job_started.emit(job.job_id)
+                try:
+                    completed = self._run_job(job)
+                except Exception as e:
+                    logger.error(f"语音任务执行失败: {e}")
+            with self._job_lock:
+                self.current_job = None
+                self._active_jobs.pop(job.job_id, None)
+            self.tts_job_finished.emit(
+                job.job_id, completed and not job.cancel_event.is_set()
             )
-            self.audio_thread.start()
 
-            logger.debug("主程序继续执行，音频正在播放...")
+    def _run_job(self, job):
+        """执行一个语音任务 (在语音任务线程中调用)
 
-        except Exception as e:
-            logger.error(f"发生错误: {e}")
+        Returns:
+            bool: 是否成功生成音频
+        """
+        if job.audio_data is not None:
+            self.play_audio(job.audio_data)
+            return True
+        text, (speaker_id, lang, format, length) = job.text, job.args
+        if format == "wav" and (self.PIPELINE or self.STREAM):
+            sentences = self.split_sentences(text) if self.PIPELINE else [text]
+            if len(sentences) > 1 or self.STREAM:
+                logger.info(f"流式合成播放, 共{len(sentences)}句")
+                self.play_audio_pipelined(sentences, *job.args)
+                return True
+        audio_data = self.get_audio_stream(text, speaker_id, lang, format, length)
+        if audio_data is None:
+            logger.error("生成音频失败，无法播放。")
+            return False
+        if job.cancel_event.is_set():
+            return False
+        logger.info("音频生成成功，正在播放...")
+        self.play_audio(audio_data)
+        return True
+
+    def _submit(self, job, interrupt):
+        """提交语音任务
+
+        Args:
+            job (TTSJob): 语音任务
+            interrupt (bool): 是否打断正在播放和排队中的任务
+
+        Returns:
+            int: 任务编号
+        """
+        if interrupt:
+            current = self.current_job
+            if current is not None and current.filler and self.output_engine is not None:
+                self._handoff_filler(current, job)
+            else:
+                self.vits_stop_audio()
+        with self._job_lock:
+            self._active_jobs[job.job_id] = job
+        self._jobs.put(job)
+        return job.job_id
+
+    def _handoff_filler(self, filler, job):
+        """正式回复接替填充语音: 取消所有已提交的任务, 但填充语音继续输出,
+        直到回复的第一块音频写入输出流时才淡出 (两者重叠FILLER_CROSSFADE_TIME秒)
+
+        Args:
+            filler (TTSJob): 正在播放的填充语音任务
+            job (TTSJob): 接替的语音任务
+        """
+        with self._job_lock:
+            for other in self._active_jobs.values():
+                if other is filler:
+                    other.handoff = True  # 先标记接替, 再取消任务
+                other.cancel_event.set()
+            job.crossfade = True
+
+    def vits_play(
+        self, text, speaker_id=None, lang="jp", format="wav", length=1.0, interrupt=True
+    ):
+        """输入文本，生成并播放音频 (立即返回, 合成与播放在语音任务线程中执行)
 
-    def vits_stop_audio(self):
-        """停止音频播放"""
-        if pygame.mixer.get_init() and pygame.mixer.music.get_busy():
+        Args:
+            interrupt (bool, optional): 是否打断之前的播放, False时排队依次播放. Defaults to True.
+
+        Returns:
+            int: 任务编号, 结果通过tts_job_started/tts_job_finished信号通知
+        """
+        job = TTSJob(next(self._job_ids), text=text, args=(speaker_id, lang, format, length))
+        return self._submit(job, interrupt)
+
+    def vits_play_audio_data(self, audio_data, interrupt=True):
+        """播放已生成的音频 (立即返回, 播放在语音任务线程中执行)
+
+        Returns:
+            int | None: 任务编号, 音频为空时返回None
+        """
+        if audio_data is None:
+            logger.error("生成音频失败，无法播放。")
+            return None
+        job = TTSJob(next(self._job_ids), audio_data=audio_data)
+        return self._submit(job, interrupt)
+
+    def cancel_job(self, job_id):
+        """取消指定的语音任务 (排队中的任务不再执行, 正在执行的任务立即停止播放)
+
+        Returns:
+            bool: 任务是否存在
+        """
+        with self._job_lock:
+            job = self._active_jobs.get(job_id)
+            if job is None:
+                return False
+            job.cancel_event.set()
+            is_current = job is self.current_job
+        if is_current:
+            self._stop_output()
+        return True
+
+    def _stop_output(self, fade_time=0.0):
+        """停止音频输出
+
+        Args:
+            fade_time (float, optional): 淡出时长(秒), 仅sounddevice输出支持. Defaults to 0.0.
+        """
+        if self.output_engine is not None:
+            self.output_engine.stop(fade_time)  # 停止常驻输出流的播放
+        if pygame.mixer.get_init():
             pygame.mixer.music.stop()  # 停止播放音频
-            self.stop_event.set()  # 设置停止事件
-            if self.audio_thread and self.audio_thread.is_alive():
-                self.audio_thread.join()  # 等待音频播放线程安全停止
+            pygame.mixer.stop()  # 停止流水线模式的声道播放
+
+    def prefetch_fillers(self, texts):
+        """后台预先合成填充语音 (启动时调用, 对话过程中不再请求服务)
+
+        Args:
+            texts (list): 填充语音文本列表
+        """
+
+        def prefetch():
+            for text in texts:
+                audio_data = self.get_audio_stream(text)
+                if audio_data is not None:
+                    self.filler_audio[text] = audio_data
+            logger.info(f"填充语音预合成完成: {len(self.filler_audio)}/{len(texts)}句")
+
+        threading.Thread(target=prefetch, daemon=True).start()
+
+    def play_filler(self):
+        """随机播放一句已预合成的填充语音 (有其他语音正在播放或排队时不播放)
+
+        Returns:
+            int | None: 任务编号, 未播放时返回None
+        """
+        if not self.filler_audio:
+            return None
+        with self._job_lock:
+            if self._active_jobs:
+                return None
+        text = random.choice(list(self.filler_audio))
+        logger.debug(f"播放填充语音: {text}")
+        job = TTSJob(
+            next(self._job_ids), audio_data=self.filler_audio[text], filler=True
+        )
+        return self._submit(job, interrupt=False)
+
+    def barge_in(self, duck_gain=None):
+        """用户插话: 标记当前回复已被打断, 取消排队中的语音任务, 并停止当前播放或降低其音量
+
+        Args:
+            duck_gain (float, optional): 降低音量后的增益, None表示直接停止播放. Defaults to None.
+        """
+        with self._job_lock:
+            self.reply_generation += 1
+        if duck_gain is None or self.output_engine is None:
+            self.vits_stop_audio()
+            return
+        with self._job_lock:
+            for job in self._active_jobs.values():
+                if job is self.current_job:
+                    job.gain = duck_gain  # 尚未开始输出时, 开始播放后同样降低音量
+                else:
+                    job.cancel_event.set()
+            self.output_engine.set_gain(duck_gain)
+
+    def vits_stop_audio(self, fade_time=0.0):
+        """停止音频播放, 并取消所有排队中的语音任务 (不等待任务线程, 不阻塞界面)
+
+        Args:
+            fade_time (float, optional): 淡出时长(秒), 仅sounddevice输出支持. Defaults to 0.0.
+        """
+        with self._job_lock:
+            jobs = list(self._active_jobs.values())
+            for job in jobs:
+                job.cancel_event.set()  # 设置停止事件
+        if jobs:
+            self._stop_output(fade_time)
             logger.info("音频播放已被停止")
 
     def clean_text_for_vits(self, text):
@@ -0,0 +1,256 @@
+# voiceprintStore_module.py (声纹特征增量存储)
+
+import os, sqlite3, threading
+import numpy as np
+from typing import List, Dict
+import logging
+
+# 获取根记录器
+logger = logging.getLogger("voiceprintStore_module")
+
+
+class VoicePrintStore:
+    """声纹样本库的增量磁盘存储
+
+    元数据保存在SQLite中, 声纹特征按行追加写入float32二进制文件并通过内存映射读取.
+    删除操作只写入墓碑标记, 墓碑比例过高时自动压缩特征文件.
+    注册/删除单条记录无需重写整个样本库, 特征文件在首次读取时才映射.
+    """
+
+    def __init__(self, database_dir, compact_ratio=0.5, compact_min_rows=64):
+        """声纹存储初始化
+
+        Args:
+            database_dir (str): 数据库目录
+            compact_ratio (float, optional): 触发压缩的墓碑比例. Defaults to 0.5.
+            compact_min_rows (int, optional): 触发压缩的最少墓碑数量. Defaults to 64.
+        """
+        os.makedirs(database_dir, exist_ok=True)  # 确保数据库目录存在
+        self.db_path = os.path.join(database_dir, "voiceprint.db")
+        self.emb_path = os.path.join(database_dir, "voiceprint_emb.f32")
+        self.compact_ratio = compact_ratio
+        self.compact_min_rows = compact_min_rows
+        self.version = 0  # 每次数据变化后递增, 供上层判断缓存是否失效
+        self._lock = threading.Lock()
+        self._mmap = None  # 特征文件的内存映射 (懒加载)
+
+        with self._get_conn() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS voiceprints
+                         (id TEXT PRIMARY KEY,
+                          row_index INTEGER NOT NULL,
+                          person_name TEXT,
+                          deleted INTEGER NOT NULL DEFAULT 0,
+                          timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS meta
+                         (key TEXT PRIMARY KEY,
+                          value TEXT NOT NULL)"""
+            )
+            row = conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        self.dim = int(row[0]) if row else None
+        self._recover_compact()
+
+    def _recover_compact(self):
+        """检查上次压缩是否中断并完成/回滚
+
+        压缩时先写入临时特征文件, 行号更新与compact_pending标记在同一事务中提交, 之后才替换特征文件:
+        有标记时行号已经指向临时文件, 需要完成替换; 没有标记时临时文件尚未生效, 直接删除.
+        """
+        tmp_path = self.emb_path + ".tmp"
+        with self._get_conn() as conn:
+            pending = conn.execute(
+                "SELECT value FROM meta WHERE key = 'compact_pending'"
+            ).fetchone()
+            if pending:
+                if os.path.exists(tmp_path):
+                    logger.warning("声纹特征文件压缩中断, 完成特征文件替换")
+                    os.replace(tmp_path, self.emb_path)
+                conn.execute("DELETE FROM meta WHERE key = 'compact_pending'")
+            elif os.path.exists(tmp_path):
+                logger.warning("声纹特征文件压缩中断, 丢弃未生效的临时文件")
+                os.remove(tmp_path)
+
+    def _get_conn(self):
+        """获取新数据库连接"""
+        return sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,  # 允许跨线程使用
+            isolation_level=None,  # 关闭自动提交
+        )
+
+    def _close_mmap(self):
+        """释放特征文件的内存映射 (追加或替换文件前调用)"""
+        if self._mmap is not None:
+            del self._mmap
+            self._mmap = None
+
+    def _embeddings(self):
+        """获取特征文件的只读内存映射 [行数, 维度]"""
+        if self._mmap is None and self.dim:
+            num_rows = os.path.getsize(self.emb_path) // (4 * self.dim)
+            if num_rows > 0:
+                self._mmap = np.memmap(
+                    self.emb_path, dtype=np.float32, mode="r", shape=(num_rows, self.dim)
+                )
+        return self._mmap
+
+    def __len__(self):
+        with self._get_conn() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM voiceprints WHERE deleted = 0"
+            ).fetchone()[0]
+
+    def records(self) -> List[Dict]:
+        """获取所有有效记录的元数据 (不读取特征)"""
+        with self._get_conn() as conn:
+            rows = conn.execute(
+                """SELECT id, person_name, row_index FROM voiceprints
+                   WHERE deleted = 0 ORDER BY row_index"""
+            ).fetchall()
+        return [dict(zip(["id", "person_name", "row_index"], row)) for row in rows]
+
+    def load_embeddings(self):
+        """读取所有有效记录的特征
+
+        Returns:
+            tuple: (特征矩阵副本[N, D], 记录元数据列表)
+        """
+        with self._lock:  # 与压缩互斥, 保证行号与特征文件一致
+            records = self.records()
+            embeddings = self._embeddings()
+            if not records or embeddings is None:
+                return np.zeros((0, self.dim or 0), dtype=np.float32), []
+            rows = [r["row_index"] for r in records]
+            return np.array(embeddings[rows], dtype=np.float32), records
+
+    def add(self, unique_id, person_name, embedding):
+        """追加一条声纹记录, 只写入这一条数据
+
+        Args:
+            unique_id (str): 声纹UID
+            person_name (str): 用户名称
+            embedding (np.ndarray): 声纹特征
+        """
+        self.add_many([(unique_id, person_name, embedding)])
+
+    def add_many(self, entries):
+        """批量追加声纹记录, 元数据在同一个事务中写入 (全部成功或全部不生效)
+
+        Args:
+            entries (list): 元素为(声纹UID, 用户名称, 声纹特征)
+        """
+        if not entries:
+            return
+        embeddings = [np.asarray(e[2], dtype=np.float32).reshape(-1) for e in entries]
+        with self._lock:
+            with self._get_conn() as conn:
+                if self.dim is None:
+                    self.dim = len(embeddings[0])
+                    conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)",
+                        (str(self.dim),),
+                    )
+                for embedding in embeddings:
+                    if len(embedding) != self.dim:
+                        raise ValueError(
+                            f"声纹特征维度不一致: {len(embedding)} != {self.dim}, 更换声纹模型后需要重新注册"
+                        )
+                # 先追加特征再写入元数据, 中途失败只会留下未被引用的行
+                self._close_mmap()
+                row_bytes = 4 * self.dim
+                size = os.path.getsize(self.emb_path) if os.path.exists(self.emb_path) else 0
+                first_row = size // row_bytes
+                if size % row_bytes:
+                    # 上次追加写入中断留下了不完整的行, 截断后新行才能与行号对齐
+                    logger.warning("声纹特征文件末尾有不完整的行, 已截断")
+                    os.truncate(self.emb_path, first_row * row_bytes)
+                with open(self.emb_path, "ab") as f:
+                    f.write(np.stack(embeddings).tobytes())
+                conn.execute("BEGIN")
+                conn.executemany(
+                    """INSERT INTO voiceprints (id, row_index, person_name)
+                       VALUES (?, ?, ?)""",
+                    [
+                        (unique_id, first_row + i, person_name)
+                        for i, (unique_id, person_name, _) in enumerate(entries)
+                    ],
+                )
+                conn.execute("COMMIT")
+            self.version += 1
+
+    def remove(self, unique_id=None, person_name=None):
+        """为指定记录写入墓碑标记
+
+        Args:
+            unique_id (str, optional): 声纹UID. Defaults to None.
+            person_name (str, optional): 用户名称. Defaults to None.
+
+        Returns:
+            list: 被删除的记录元数据
+        """
+        removed = [
+            r
+            for r in self.records()
+            if (unique_id and r["id"] == unique_id)
+            or (person_name and r["person_name"] == person_name)
+        ]
+        if not removed:
+            return []
+        with self._lock:
+            with self._get_conn() as conn:
+                conn.executemany(
+                    "UPDATE voiceprints SET deleted = 1 WHERE id = ?",
+                    [(r["id"],) for r in removed],
+                )
+                conn.commit()
+            self.version += 1
+        self._maybe_compact()
+        return removed
+
+    def _maybe_compact(self):
+        """墓碑数量过多时压缩特征文件"""
+        with self._get_conn() as conn:
+            deleted, total = conn.execute(
+                "SELECT COALESCE(SUM(deleted), 0), COUNT(*) FROM voiceprints"
+            ).fetchone()
+        if deleted >= self.compact_min_rows and deleted >= total * self.compact_ratio:
+            self.compact()
+
+    def compact(self):
+        """重写特征文件, 移除墓碑记录并重排行号
+
+        整个过程持有锁, 期间的注册/删除会等待压缩完成. 行号更新提交后才替换特征文件,
+        中途退出时由_recover_compact在下次打开时完成或回滚.
+        """
+        with self._lock:
+            records = self.records()
+            embeddings = self._embeddings()
+            if embeddings is None:
+                live = np.zeros((0, self.dim or 0), dtype=np.float32)
+            else:
+                live = np.array(
+                    embeddings[[r["row_index"] for r in records]], dtype=np.float32
+                )
+            self._close_mmap()
+            tmp_path = self.emb_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(live.tobytes())
+                f.flush()
+                os.fsync(f.fileno())  # 标记提交前临时文件必须完整落盘
+            with self._get_conn() as conn:
+                conn.execute("BEGIN")
+                conn.execute("DELETE FROM voiceprints WHERE deleted = 1")
+                conn.executemany(
+                    "UPDATE voiceprints SET row_index = ? WHERE id = ?",
+                    [(i, r["id"]) for i, r in enumerate(records)],
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('compact_pending', '1')"
+                )
+                conn.execute("COMMIT")
+                os.replace(tmp_path, self.emb_path)
+                conn.execute("DELETE FROM meta WHERE key = 'compact_pending'")
+            self.version += 1
+        logger.info(f"声纹特征文件压缩完成, 保留{len(records)}条记录")
@@ -0,0 +1,150 @@
+# vprIndex_module.py (声纹特征近似最近邻索引)
+
+import numpy as np
+import logging
+
+# 获取根记录器
+logger = logging.getLogger("vprIndex_module")
+
+
+class IVFIndex:
+    """纯numpy实现的倒排文件(IVF)近似最近邻索引
+
+    使用球面k-means将L2归一化的声纹特征划分为nlist个簇,
+    检索时只在与查询最接近的nprobe个簇内做精确的余弦打分.
+    支持增量添加/删除, 数据规模相对训练时变化过大时需要重建(needs_rebuild).
+    """
+
+    def __init__(self, nlist=0, nprobe=8, kmeans_iters=10, seed=0):
+        """索引初始化
+
+        Args:
+            nlist (int, optional): 簇数量, 0表示按sqrt(N)自动设置. Defaults to 0.
+            nprobe (int, optional): 检索时访问的簇数量. Defaults to 8.
+            kmeans_iters (int, optional): k-means迭代次数. Defaults to 10.
+            seed (int, optional): 随机种子. Defaults to 0.
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.kmeans_iters = kmeans_iters
+        self.seed = seed
+        self.centroids = None
+        self._list_ids = []  # 每个簇内的id列表
+        self._list_vectors = []  # 每个簇内的特征矩阵
+        self._id_to_list = {}  # id -> 所在簇编号
+        self._trained_size = 0
+
+    def __len__(self):
+        return len(self._id_to_list)
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _assign(self, vectors, batch_size=4096):
+        """计算每个特征所属的最近簇"""
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), batch_size):
+            batch = vectors[start : start + batch_size]
+            assignments[start : start + batch_size] = np.argmax(
+                batch @ self.centroids.T, axis=1
+            )
+        return assignments
+
+    def build(self, vectors, ids):
+        """从全部特征训练并构建索引
+
+        Args:
+            vectors (np.ndarray): 特征矩阵 [N, D]
+            ids (list): 与特征一一对应的id
+        """
+        vectors = self._normalize(vectors)
+        num = len(vectors)
+        nlist = self.nlist or max(1, int(np.sqrt(num)))
+        nlist = min(nlist, max(1, num))
+        rng = np.random.default_rng(self.seed)
+
+        # 球面k-means: 簇中心为归一化后的簇内均值
+        self.centroids = vectors[rng.choice(num, nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            assignments = self._assign(vectors)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assignments, vectors)
+            counts = np.bincount(assignments, minlength=nlist)
+            empty = counts == 0
+            if empty.any():  # 空簇重新随机初始化
+                sums[empty] = vectors[rng.choice(num, int(empty.sum()))]
+            self.centroids = self._normalize(sums)
+
+        assignments = self._assign(vectors)
+        ids = np.asarray(ids, dtype=object)
+        self._list_ids = []
+        self._list_vectors = []
+        self._id_to_list = {}
+        for c in range(nlist):
+            members = np.flatnonzero(assignments == c)
+            self._list_ids.append(list(ids[members]))
+            self._list_vectors.append(vectors[members])
+            for _id in ids[members]:
+                self._id_to_list[_id] = c
+        self._trained_size = num
+        logger.info(f"IVF索引构建完成: {num}条特征, {nlist}个簇")
+
+    def add(self, vector, _id):
+        """增量添加一条特征"""
+        vector = self._normalize(vector).reshape(1, -1)
+        c = int(np.argmax(self.centroids @ vector[0]))
+        self._list_ids[c].append(_id)
+        self._list_vectors[c] = np.vstack((self._list_vectors[c], vector))
+        self._id_to_list[_id] = c
+
+    def remove(self, _id):
+        """增量删除一条特征
+
+        Returns:
+            bool: 是否删除成功
+        """
+        c = self._id_to_list.pop(_id, None)
+        if c is None:
+            return False
+        pos = self._list_ids[c].index(_id)
+        del self._list_ids[c][pos]
+        self._list_vectors[c] = np.delete(self._list_vectors[c], pos, axis=0)
+        return True
+
+    def needs_rebuild(self):
+        """数据规模相对训练时翻倍或减半后, 簇划分不再合理, 需要重建"""
+        size = len(self)
+        return size > 2 * self._trained_size or size < self._trained_size // 2
+
+    def search(self, query, top_k=5):
+        """检索与查询最相似的特征
+
+        Args:
+            query (np.ndarray): 查询特征 [D]
+            top_k (int, optional): 返回数量. Defaults to 5.
+
+        Returns:
+            tuple: (id列表, 余弦相似度数组), 按相似度降序
+        """
+        if self.centroids is None or len(self) == 0:
+            return [], np.zeros(0, dtype=np.float32)
+        query = self._normalize(query).reshape(-1)
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+
+        candidate_ids = []
+        candidate_scores = []
+        for c in probes:
+            if len(self._list_ids[c]):
+                candidate_ids.extend(self._list_ids[c])
+                candidate_scores.append(self._list_vectors[c] @ query)
+        if not candidate_ids:
+            return [], np.zeros(0, dtype=np.float32)
+        scores = np.concatenate(candidate_scores)
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [candidate_ids[i] for i in top], scores[top]
@@ -1,8 +1,12 @@
 # vpr_module.py (声纹识别)
 
 import numpy as np
-import os, uuid, pickle
+import torch
+import os, uuid, pickle, threading, hashlib
+from collections import OrderedDict
 from modelscope.pipelines import pipeline
+from voiceprintStore_module import VoicePrintStore
+from vprIndex_module import IVFIndex
 import logging
 from logging_config import gcww
 
@@ -10,11 +14,52 @@ from logging_config import gcww
 logger = logging.getLogger("vpr_module")
 
 
+class EmbeddingCache:
+    """以音频内容哈希为键的声纹特征LRU缓存 (线程安全)"""
+
+    def __init__(self, max_size=256):
+        """缓存初始化
+
+        Args:
+            max_size (int, optional): 最多缓存的特征数量. Defaults to 256.
+        """
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(audio_data):
+        """计算音频内容的哈希键"""
+        audio_data = np.ascontiguousarray(audio_data)
+        digest = hashlib.blake2b(audio_data, digest_size=16).hexdigest()
+        return f"{audio_data.dtype.str}:{len(audio_data)}:{digest}"
+
+    def get(self, key):
+        with self._lock:
+            embedding = self._data.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, key, embedding):
+        with self._lock:
+            self._data[key] = embedding
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+
 class VoicePrintRecognition:
     def __init__(self, main_settings):
         self.settings = main_settings
         self.database_dir = gcww(self.settings, "database_dir", "./database", logger)
         os.makedirs(self.database_dir, exist_ok=True)  # 确保数据库目录存在
+        # 旧版pickle样本库路径 (仅用于一次性迁移)
         self.sample_db_path = os.path.join(self.database_dir, "voicePrintDB.pkl")
         self.vpr_model = gcww(
             self.settings,
@@ -25,6 +70,20 @@ class VoicePrintRecognition:
         self.similarity_threshold = gcww(
             self.settings, "vpr_similarity_threshold", 0.7, logger
         )
+        # 近似最近邻索引设置 (样本库较大时替代精确比对)
+        self.ann_switch = gcww(self.settings, "vpr_ann_switch", False, logger)
+        self.ann_min_size = gcww(self.settings, "vpr_ann_min_size", 1000, logger)
+        self.ann_nprobe = gcww(self.settings, "vpr_ann_nprobe", 8, logger)
+        # 声纹特征缓存设置 (相同音频片段只计算一次特征)
+        self.embedding_cache = EmbeddingCache(
+            gcww(self.settings, "vpr_embedding_cache_size", 256, logger)
+        )
+        self.segment_samples = int(
+            gcww(self.settings, "vpr_embedding_segment_time", 1.5, logger) * 16000
+        )
+        # 批量推理设置 (长度相近的片段循环填充后一次前向推理)
+        self.batch_size = gcww(self.settings, "vpr_batch_size", 8, logger)
+        self.batch_pad_ratio = gcww(self.settings, "vpr_batch_pad_ratio", 1.25, logger)
 
         # 初始化声纹识别模型
         self.sv_pipeline = pipeline(
@@ -32,24 +91,100 @@ class VoicePrintRecognition:
             model=self.vpr_model,
         )
 
-        # 初始化样本数据库，加载现有数据
-        self.voicePrintDB = self._load_sample_db()
+        # 初始化样本数据库 (SQLite元数据 + 内存映射特征文件, 特征按需读取)
+        self.store = VoicePrintStore(self.database_dir)
+        self._migrate_pickle_db()
+        # 归一化声纹特征矩阵缓存 (仅在样本库变化后重建)
+        self._matrix_cache = None
+        self._matrix_version = -1
+        # 近似最近邻索引 (样本数达到vpr_ann_min_size后才构建)
+        self.ann_index = None
+        self._ann_names = {}  # 索引内的声纹UID -> 用户名称
+        self._ann_checked_version = -1
+        self._ann_lock = threading.Lock()
 
     def _generate_unique_id(self):
         """生成唯一的ID"""
         return str(uuid.uuid4())
 
-    def _load_sample_db(self):
-        """加载持久化的样本数据库"""
-        if os.path.exists(self.sample_db_path):
-            with open(self.sample_db_path, "rb") as f:
-                return pickle.load(f)
-        return {}  # 如果没有数据，返回空字典
+    def _migrate_pickle_db(self):
+        """将旧版pickle样本库一次性迁移到增量存储
+
+        所有样本在同一个事务中写入, 确认样本库中包含全部旧版样本后才重命名pickle文件;
+        迁移中断时保留pickle文件, 下次启动时只补充缺少的样本.
+        """
+        if not os.path.exists(self.sample_db_path):
+            return
+        with open(self.sample_db_path, "rb") as f:
+            legacy_db = pickle.load(f)
+        existing = {r["id"] for r in self.store.records()}
+        missing = [
+            (_id, sample_info["person_name"], sample_info["embedding"])
+            for _id, sample_info in legacy_db.items()
+            if _id not in existing
+        ]
+        if missing:
+            logger.warning(f"迁移旧版声纹库: {self.sample_db_path} ({len(missing)}条)")
+            self.store.add_many(missing)
+        migrated = sum(1 for r in self.store.records() if r["id"] in legacy_db)
+        if migrated != len(legacy_db):
+            logger.error(
+                f"旧版声纹库迁移不完整 ({migrated}/{len(legacy_db)}), 保留{self.sample_db_path}, 下次启动时重试"
+            )
+            return
+        # 迁移完成后不再读取pickle文件
+        os.replace(self.sample_db_path, self.sample_db_path + ".migrated")
+
+    def _get_embedding_matrix(self):
+        """获取样本库的L2归一化float32特征矩阵, 样本库变化后才重建
+
+        Returns:
+            tuple: (特征矩阵[N, D], 用户名称列表, 声纹UID列表)
+        """
+        if self._matrix_cache is None or self._matrix_version != self.store.version:
+            self._matrix_version = self.store.version
+            matrix, records = self.store.load_embeddings()
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.maximum(norms, 1e-12)
+            names = [r["person_name"] for r in records]
+            ids = [r["id"] for r in records]
+            self._matrix_cache = (matrix, names, ids)
+        return self._matrix_cache
+
+    def _refresh_ann_index(self):
+        """按需构建或重建近似最近邻索引
 
-    def _save_sample_db(self):
-        """将样本数据库持久化存储"""
-        with open(self.sample_db_path, "wb") as f:
-            pickle.dump(self.voicePrintDB, f)
+        Returns:
+            bool: 当前是否使用近似最近邻索引
+        """
+        if not self.ann_switch:
+            return False
+        with self._ann_lock:
+            if self.ann_index is not None:
+                if not self.ann_index.needs_rebuild():
+                    return True
+            elif self._ann_checked_version == self.store.version:
+                return False  # 样本库未变化, 无需重新统计数量
+            self._ann_checked_version = self.store.version
+            if len(self.store) < self.ann_min_size:
+                self.ann_index = None
+                self._ann_names = {}
+                return False
+            embeddings, records = self.store.load_embeddings()
+            index = IVFIndex(nprobe=self.ann_nprobe)
+            index.build(embeddings, [r["id"] for r in records])
+            self._ann_names = {r["id"]: r["person_name"] for r in records}
+            self.ann_index = index
+            return True
+
+    def _add_record(self, unique_id, person_name, embedding):
+        """写入一条声纹记录并增量更新近似最近邻索引"""
+        self.store.add(unique_id, person_name, embedding)
+        with self._ann_lock:
+            if self.ann_index is not None:  # 增量更新索引
+                self.ann_index.add(embedding, unique_id)
+                self._ann_names[unique_id] = person_name
+                self._ann_checked_version = self.store.version
 
     def register_voiceprint(self, audio_frames, person_name=None):
         """注册新的声纹样本
@@ -69,20 +204,10 @@ class VoicePrintRecognition:
         unique_id = self._generate_unique_id()
 
         # 提取音频的声纹特征（embedding）
-        audio_data = np.concatenate(audio_frames, axis=0)  # 合并音频数据
-        result = self.sv_pipeline([audio_data], output_emb=True)
-        embedding = result["embs"][0]  # 提取声纹特征
-
-        # 保存声纹特征和相关信息
-        sample_info = {
-            "id": unique_id,
-            "embedding": embedding,
-            "person_name": person_name,
-        }
+        embedding = self.extract_embedding(audio_frames)
 
-        # 添加到样本数据库
-        self.voicePrintDB[unique_id] = sample_info
-        self._save_sample_db()  # 将数据库同步保存到磁盘
+        # 追加到样本数据库 (仅写入这一条记录)
+        self._add_record(unique_id, person_name, embedding)
 
         logger.info(f"{person_name}声纹注册成功")
 
@@ -98,36 +223,265 @@ class VoicePrintRecognition:
         Returns:
             bool: 是否成功删除
         """
-        _return_flag = False
-
         if unique_id == None and person_name == None:
             logger.warning("请输入声纹的unique_id或person_name")
             return False
 
-        if unique_id:  # 匹配unique_id
-            for _id, _ in list(self.voicePrintDB.items()):
-                if _id == unique_id:
-                    _return_flag = True
-                    del self.voicePrintDB[_id]
-                    logger.info(f"{unique_id}声纹删除成功")
-
-        if person_name:  # 匹配person_name
-            for _id, sample_info in list(self.voicePrintDB.items()):
-                _person_name = sample_info["person_name"]
-                if _person_name == person_name:
-                    _return_flag = True
-                    del self.voicePrintDB[_id]
-                    logger.info(f"{person_name}声纹删除成功")
+        # 写入墓碑标记, 不重写整个样本库
+        removed = self.store.remove(unique_id=unique_id, person_name=person_name)
+        with self._ann_lock:
+            if self.ann_index is not None:  # 增量更新索引
+                for sample_info in removed:
+                    self.ann_index.remove(sample_info["id"])
+                    self._ann_names.pop(sample_info["id"], None)
+                self._ann_checked_version = self.store.version
+        for sample_info in removed:
+            logger.info(f"{sample_info['person_name']}_{sample_info['id']}声纹删除成功")
 
-        self._save_sample_db()  # 将数据库同步保存到磁盘
-
-        return _return_flag
+        return len(removed) > 0
 
     def list_voiceprint(self):
         """查看声纹库数据"""
-        for _id, sample_info in self.voicePrintDB.items():
+        for sample_info in self.store.records():
             _person_name = sample_info["person_name"]
-            logger.info(f"voicePrintDB: {_person_name}_{_id}")
+            logger.info(f"voicePrintDB: {_person_name}_{sample_info['id']}")
+
+    def _group_segments(self, audio_frames):
+        """将音频序列按顺序划分为片段
+
+        足够长的音频 (如一整句话) 单独成段, 较短的音频块依次合并到不短于
+        segment_samples. 追加音频时前面已经封闭的片段保持不变, 其特征可以直接命中缓存.
+        """
+        groups = []
+        current = []
+        size = 0
+        for frame in audio_frames:
+            frame = np.asarray(frame).reshape(-1)
+            if len(frame) >= self.segment_samples // 3:
+                if current:
+                    groups.append(current)
+                    current = []
+                    size = 0
+                groups.append([frame])
+                continue
+            current.append(frame)
+            size += len(frame)
+            if size >= self.segment_samples:
+                groups.append(current)
+                current = []
+                size = 0
+        if current:
+            groups.append(current)
+        return [group[0] if len(group) == 1 else np.concatenate(group) for group in groups]
+
+    def _compute_embedding(self, audio_data):
+        """调用声纹模型计算单段音频的特征"""
+        result = self.sv_pipeline([audio_data], output_emb=True)
+        return result["embs"][0]
+
+    def _make_buckets(self, lengths):
+        """按长度将片段分桶, 同一桶内最长与最短片段之比不超过batch_pad_ratio
+
+        Returns:
+            list: 每个桶内的片段序号列表
+        """
+        order = np.argsort(lengths, kind="stable")
+        buckets = []
+        for idx in order:
+            bucket = buckets[-1] if buckets else None
+            if (
+                bucket is not None
+                and len(bucket) < self.batch_size
+                and lengths[idx] <= lengths[bucket[0]] * self.batch_pad_ratio
+            ):
+                bucket.append(int(idx))
+            else:
+                buckets.append([int(idx)])
+        return buckets
+
+    def _forward_bucket(self, wavs):
+        """对同一桶内的音频做一次批量前向推理
+
+        较短的音频循环填充到桶内最大长度 (避免补零静音影响特征).
+
+        Args:
+            wavs (list): 预处理后的float32音频张量列表
+
+        Returns:
+            list: 每段音频的声纹特征
+        """
+        max_len = max(len(wav) for wav in wavs)
+        batch = np.stack([np.resize(np.asarray(wav), max_len) for wav in wavs])
+        # 只做推理, 不构建计算图
+        with torch.no_grad():
+            embeddings = self.sv_pipeline.model(batch)
+        return [np.asarray(embedding).reshape(-1) for embedding in embeddings]
+
+    def extract_embeddings(self, segments):
+        """批量提取多段音频的声纹特征
+
+        片段按长度分桶, 每个桶只调用一次声纹模型前向推理;
+        批量推理失败时退回逐段计算.
+
+        Args:
+            segments (list): 音频片段列表, 每个元素为一段一维音频数组
+
+        Returns:
+            list: 与segments一一对应的声纹特征
+        """
+        segments = [np.asarray(segment).reshape(-1) for segment in segments]
+        embeddings = [None] * len(segments)
+        if not segments:
+            return embeddings
+        if len(segments) == 1 or self.batch_size <= 1:
+            return [self._compute_embedding(segment) for segment in segments]
+
+        wavs = self.sv_pipeline.preprocess(segments)  # int16 -> float32, 与单段推理一致
+        for bucket in self._make_buckets([len(segment) for segment in segments]):
+            if len(bucket) > 1:
+                try:
+                    results = self._forward_bucket([wavs[i] for i in bucket])
+                except Exception as e:
+                    logger.warning(f"声纹特征批量推理失败, 改为逐段计算: {e}")
+                else:
+                    for i, embedding in zip(bucket, results):
+                        embeddings[i] = embedding
+                    continue
+            for i in bucket:
+                embeddings[i] = self._compute_embedding(segments[i])
+        return embeddings
+
+    def extract_embedding(self, audio_frames, use_cache=True):
+        """提取音频序列的声纹特征
+
+        音频序列按片段计算特征并缓存, 多个片段的特征按时长加权平均,
+        因此对不断追加的音频序列只需计算新增的片段.
+
+        Args:
+            audio_frames (list): 音频序列
+            use_cache (bool, optional): 是否读写特征缓存, 之后不会再次查询的音频 (如说话人跟踪的滑动窗口)
+                应关闭, 避免挤出语句音频的缓存. Defaults to True.
+
+        Returns:
+            np.ndarray: 声纹特征 (embedding)
+        """
+        segments = self._group_segments(audio_frames)
+        if use_cache:
+            keys = [EmbeddingCache.make_key(audio_data) for audio_data in segments]
+            embeddings = [self.embedding_cache.get(key) for key in keys]
+        else:
+            embeddings = [None] * len(segments)
+        # 未命中缓存的片段一起批量计算
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            results = self.extract_embeddings([segments[i] for i in missing])
+            for i, embedding in zip(missing, results):
+                if use_cache:
+                    self.embedding_cache.put(keys[i], embedding)
+                embeddings[i] = embedding
+        embeddings = [
+            np.asarray(embedding, dtype=np.float32).reshape(-1)
+            for embedding in embeddings
+        ]
+        weights = [len(audio_data) for audio_data in segments]
+        if len(embeddings) == 1:
+            return embeddings[0]
+        embeddings = np.stack(embeddings)
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        return np.average(embeddings, axis=0, weights=weights)
+
+    def embedding_similarity(self, embedding1, embedding2):
+        """计算两个声纹特征的匹配度
+
+        Args:
+            embedding1 (np.ndarray): 声纹特征1
+            embedding2 (np.ndarray): 声纹特征2
+
+        Returns:
+            float: 余弦相似度转换到[0, 1]范围后的匹配度
+        """
+        norm1 = np.linalg.norm(embedding1)
+        norm2 = np.linalg.norm(embedding2)
+        # 计算标准的余弦相似度
+        similarity = np.dot(embedding1, embedding2) / (norm1 * norm2)
+        # 转换为范围[0, 1]
+        return (similarity + 1) / 2.0
+
+    def match_embedding_topk(self, input_embedding, top_k=5):
+        """将声纹特征与样本库整体比对, 返回超过阈值的候选用户排名
+
+        Args:
+            input_embedding (np.ndarray): 声纹特征
+            top_k (int, optional): 最多返回的候选数量. Defaults to 5.
+
+        Returns:
+            list: 按匹配度降序排列的候选, 元素为{"person_name", "score", "id"},
+                同一用户只保留匹配度最高的样本
+        """
+        query = np.asarray(input_embedding, dtype=np.float32).reshape(-1)
+        query = query / max(np.linalg.norm(query), 1e-12)
+
+        if self._refresh_ann_index():
+            # 近似检索: 多取一些候选, 以便同一用户的多个样本去重后仍有top_k个
+            with self._ann_lock:
+                ids, cosines = self.ann_index.search(query, top_k * 4)
+                names = [self._ann_names[_id] for _id in ids]
+            scores = (cosines + 1) / 2.0
+        else:
+            matrix, names, ids = self._get_embedding_matrix()
+            if len(ids) == 0:
+                return []
+            # 一次矩阵乘法得到全部余弦相似度, 转换为范围[0, 1]
+            scores = (matrix @ query + 1) / 2.0
+
+        candidates = np.flatnonzero(scores > self.similarity_threshold)
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        ranked = []
+        seen = set()
+        for idx in candidates:
+            person_name = names[idx]
+            if person_name in seen:
+                continue
+            seen.add(person_name)
+            ranked.append(
+                {"person_name": person_name, "score": float(scores[idx]), "id": ids[idx]}
+            )
+            if len(ranked) >= top_k:
+                break
+        return ranked
+
+    def match_embedding(self, input_embedding):
+        """比对声纹特征是否与样本库中任何数据匹配
+
+        Args:
+            input_embedding (np.ndarray): 声纹特征
+
+        Returns:
+            str: 匹配到的用户名称, 失配则返回"Unknown"
+        """
+        ranked = self.match_embedding_topk(input_embedding, top_k=1)
+        if not ranked:  # 如果无匹配对象超过分数阈值, 返回Unknown
+            return "Unknown"
+        logger.debug(
+            f"匹配声纹: {ranked[0]['person_name']} at {ranked[0]['score'] * 100:.2f}%"
+        )
+        return ranked[0]["person_name"]
+
+    def match_voiceprint_topk(self, audio_frames, top_k=5):
+        """比对输入的音频序列声纹, 返回样本库中的候选用户排名
+
+        Args:
+            audio_frames (list): 音频序列
+            top_k (int, optional): 最多返回的候选数量. Defaults to 5.
+
+        Returns:
+            list: 按匹配度降序排列的候选, 元素为{"person_name", "score", "id"}
+        """
+        if len(audio_frames) == 0:
+            logger.debug("match_voiceprint_topk: audio_frames为空")
+            return []
+        return self.match_embedding_topk(self.extract_embedding(audio_frames), top_k)
 
     def match_voiceprint(self, audio_frames):
         """比对输入的音频序列声纹是否与样本库中任何数据匹配
@@ -141,34 +495,7 @@ class VoicePrintRecognition:
         if len(audio_frames) == 0:
             logger.debug("match_voiceprint: audio_frames为空")
             return "Unknown"
-        audio_data = np.concatenate(audio_frames, axis=0)
-        result = self.sv_pipeline([audio_data], output_emb=True)
-        input_embedding = result["embs"][0]
-        best_match_percent = 0
-        best_match_person = "Unknown"  # 如果无匹配对象超过分数阈值, 返回Unknown
-
-        # 遍历样本库比对
-        for _, sample_info in self.voicePrintDB.items():
-            sample_embedding = sample_info["embedding"]
-            norm1 = np.linalg.norm(input_embedding)
-            norm2 = np.linalg.norm(sample_embedding)
-            # 计算标准的余弦相似度
-            similarity = np.dot(input_embedding, sample_embedding) / (norm1 * norm2)
-            # 转换为范围[0, 1]
-            similarity_percentage = (similarity + 1) / 2.0
-
-            # logger.debug(
-            #     f"和{sample_info['person_name']}匹配度: {similarity_percentage * 100:.2f}%"
-            # )
-            if similarity_percentage > self.similarity_threshold:  # 使用配置的阈值
-                logger.debug(
-                    f"匹配声纹: {sample_info['person_name']} at {similarity_percentage * 100:.2f}%"
-                )
-                # 结果维护匹配分数最高的声纹对象
-                if best_match_percent < similarity_percentage:
-                    best_match_percent = similarity_percentage
-                    best_match_person = sample_info["person_name"]
-        return best_match_person
+        return self.match_embedding(self.extract_embedding(audio_frames))
 
     def compare_two_voiceprints(self, audio_frames1, audio_frames2):
         """比对两个音频声纹序列是否匹配
@@ -186,11 +513,8 @@ class VoicePrintRecognition:
         audio_data1 = np.concatenate(audio_frames1, axis=0)
         audio_data2 = np.concatenate(audio_frames2, axis=0)
 
-        result1 = self.sv_pipeline([audio_data1], output_emb=True)
-        result2 = self.sv_pipeline([audio_data2], output_emb=True)
-
-        embedding1 = result1["embs"][0]
-        embedding2 = result2["embs"][0]
+        # 两段音频一次批量推理
+        embedding1, embedding2 = self.extract_embeddings([audio_data1, audio_data2])
         norm1 = np.linalg.norm(embedding1)
         norm2 = np.linalg.norm(embedding2)
         # 计算标准的余弦相似度